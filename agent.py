@@ -0,0 +1,133 @@
+from datetime import datetime
+from charting import chart_service
+from coingecko_client import score_assets
+from learning_layer import get_store
+from metrics import metrics
+from price_history import get_history
+from strategy import PROMPT_ASSETS, decide
+from trade_executor import execute_trade
+from visual_synthesis import HISTORY_LENGTH
+
+class Agent:
+    """
+    One trading strategy: its Recall account (client and portfolio), Gaia client, trade limits,
+    learning store, journal, scoring weights and skip rule.
+
+    Agents hold no market data of their own: cycle() takes the shared CoinGecko market list,
+    so several agents in one process (see runner.py) reuse a single fetch. Charts and price
+    history are shared too, since they depend only on the market.
+    `store=None` uses the process-wide learning_layer store, opened on first use.
+    """
+    def __init__(self, name, recall, portfolio, gaia, limiter, journal, store=None, scoring=None, skip_rule=None,
+                 universe=50, min_trades_per_day=3):
+        self.name = name
+        self.recall = recall
+        self.portfolio = portfolio
+        self.gaia = gaia
+        self.limiter = limiter
+        self.journal = journal
+        self._store = store
+        self.scoring = scoring or {}
+        self.skip_rule = skip_rule
+        self.universe = universe
+        self.min_trades_per_day = min_trades_per_day
+
+    @property
+    def store(self):
+        return self._store if self._store is not None else get_store()
+
+    def log(self, message):
+        print(f"[{self.name}] {message}" if self.name else message)
+
+    def score(self, assets):
+        # The market list is ordered by volume, so each agent's universe is a prefix of it.
+        # Only the top PROMPT_ASSETS reach the prompt, so by default only those are ranked.
+        with metrics.span('scoring'):
+            return score_assets(
+                assets[:self.universe],
+                weights=self.scoring.get('weights'),
+                normalization=self.scoring.get('normalization', 'none'),
+                top_k=self.scoring.get('top_k', PROMPT_ASSETS),
+            )
+
+    async def _infer(self, prompt, scored, cache_key):
+        return await self.gaia.gaia_infer_from_prompt(prompt, cache_key=cache_key)
+
+    async def decide_stage(self, scored):
+        """
+        Prompt Gaia with the scored assets and resolve its choice to a Recall symbol.
+        Returns a decision dict for execute_stage, or None when there is nothing to trade.
+        """
+        # 2-4.5. Gaia prompt and inference, Recall symbol mapping and learning-layer check
+        decision, note = await decide(scored, self._infer, self.portfolio.resolve, self.store.get_asset_stats, skip_rule=self.skip_rule)
+        if note:
+            self.log(note)
+        return decision
+
+    async def execute_stage(self, decision):
+        asset_symbol = decision['asset']
+        action = decision['action']
+        amount = decision['amount']
+        reasoning = decision['reasoning']
+        stats = decision['stats']
+        # 5. Reserve a slot under the trade limits (here rather than in decide_stage, so a
+        # decision made while the previous trade was executing sees its count)
+        reservation, limit_reason = self.limiter.reserve(asset_symbol)
+        if reservation is None:
+            metrics.inc('trades_skipped_total', reason='limit')
+            self.log(f"[WARN] {limit_reason}. Skipping trade.")
+            return None
+        # 6. Chart snapshot, rendered off the event loop while the trade executes
+        history = get_history(asset_symbol).to_records(HISTORY_LENGTH)
+        chart_task = chart_service.submit(asset_symbol, history)
+        # 7. Execute trade
+        outcome = None
+        try:
+            outcome = await execute_trade(asset_symbol, action, amount=amount, client=self.recall, portfolio=self.portfolio)
+        finally:
+            if outcome is not None and outcome['status'] == 'executed':
+                self.limiter.commit(reservation)
+            else:
+                self.limiter.release(reservation)
+        try:
+            chart_snapshot = await chart_task
+        except Exception as e:
+            self.log(f"[WARN] Chart rendering failed for {asset_symbol}: {e}")
+            chart_snapshot = None
+        # 8. Log journal entry
+        log_entry = {
+            "timestamp": datetime.utcnow().isoformat(timespec='minutes') + 'Z',
+            "asset": asset_symbol,
+            "decision": f"{action} {amount} {asset_symbol}",
+            "reasoning": reasoning,
+            "chart_snapshot": chart_snapshot,
+            "outcome": outcome,
+            "learning_stats": stats
+        }
+        if self.name:
+            log_entry["agent"] = self.name
+        self.journal.write(log_entry)
+        # 9. Record trade in learning layer
+        # Only executed trades count towards the skip rule; failed, timed-out and skipped attempts
+        # stay in the journal. The realized return is not known yet; it is filled in later via update_outcome
+        if outcome is not None and outcome['status'] == 'executed':
+            self.store.record_trade(asset_symbol, action, amount, reasoning)
+        return log_entry
+
+    async def cycle(self, assets):
+        """
+        Score, decide and execute against an already-fetched market list.
+        """
+        decision = await self.decide_stage(self.score(assets))
+        if decision is None:
+            return None
+        return await self.execute_stage(decision)
+
+    def daily_reset(self):
+        counts = self.limiter.counts()
+        if counts['overall'] < self.min_trades_per_day:
+            self.log(f"[WARN] Only {counts['overall']} trades made today (minimum required: {self.min_trades_per_day}).")
+        self.limiter.reset()
+
+    def save_caches(self):
+        self.gaia.save_cache()
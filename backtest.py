@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime
+from coingecko_client import score_assets
+from journal import JournalWriter, open_file
+from learning_layer import TradeStore
+from portfolio_service import PortfolioService
+from settings import load_config
+from strategy import PROMPT_ASSETS, decide
+
+SNAPSHOT_DIR = 'logs/snapshots'
+SNAPSHOT_PREFIX = 'snapshots'
+
+class SnapshotRecorder:
+    """
+    Appends each cycle's raw CoinGecko market list (and optional Recall prices) to daily
+    logs/snapshots/snapshots_<date>.jsonl files for later replay by BacktestEngine.
+    """
+    def __init__(self, directory=SNAPSHOT_DIR, compress=True):
+        self.writer = JournalWriter(directory=directory, prefix=SNAPSHOT_PREFIX, fsync='never', compress=compress)
+
+    def record(self, markets, prices=None, timestamp=None):
+        snapshot = {'timestamp': timestamp or datetime.utcnow().isoformat(timespec='seconds') + 'Z', 'markets': markets}
+        if prices:
+            snapshot['prices'] = prices
+        self.writer.write(snapshot)
+
+    async def start(self):
+        # Until started, every record() encodes and writes synchronously on the event loop
+        await self.writer.start()
+
+    async def close(self):
+        await self.writer.close()
+
+def build_snapshot_recorder(config):
+    options = config.get('backtest') or {}
+    if not options.get('record_snapshots'):
+        return None
+    return SnapshotRecorder(options.get('snapshot_dir', SNAPSHOT_DIR))
+
+def load_snapshots(path):
+    """
+    Stream snapshots, oldest first, from one file or a directory of snapshot files (.jsonl, .gz, .zst).
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.startswith(SNAPSHOT_PREFIX + '_') and '.jsonl' in name
+        )
+    else:
+        files = [path]
+    for file in files:
+        with open_file(file) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def snapshot_prices(snapshot):
+    """
+    {SYMBOL: price} for a snapshot; recorded Recall prices take precedence over CoinGecko's.
+    """
+    prices = {a['symbol'].upper(): a.get('current_price') for a in snapshot['markets'] if a.get('symbol')}
+    prices.update({symbol.upper(): price for symbol, price in (snapshot.get('prices') or {}).items()})
+    return prices
+
+class SnapshotPortfolio:
+    """
+    Stand-in for RecallSandboxClient.get_portfolio that lists the tokens of the current
+    snapshot, so PortfolioService resolves Gaia's asset names exactly as it does live.
+    """
+    def __init__(self):
+        self.snapshot = None
+
+    async def get_portfolio(self):
+        tokens = [
+            {'symbol': a['symbol'].upper(), 'name': a.get('name'), 'token': a.get('contract_address') or a.get('id')}
+            for a in self.snapshot['markets'] if a.get('symbol')
+        ]
+        return {'tokens': tokens}
+
+class MomentumGaiaStub:
+    """
+    Deterministic stand-in for Gaia: buys the top-scored asset when its 24h price change is
+    positive and sells it otherwise. Any async (prompt, scored, cache_key) -> decision callable
+    can be used instead, including one that calls the real GaiaClient.
+    """
+    def __init__(self, amount=1, price_change_key='price_change_percentage_24h_in_currency'):
+        self.amount = amount
+        self.price_change_key = price_change_key
+
+    async def __call__(self, prompt, scored, cache_key):
+        if not scored:
+            return {'asset': None, 'action': 'Hold', 'amount': self.amount, 'reason': 'No assets scored.'}
+        asset, score = scored[0]
+        change = asset.get(self.price_change_key) or 0
+        action = 'Buy' if change > 0 else 'Sell'
+        return {'asset': asset['symbol'], 'action': action, 'amount': self.amount, 'reason': f"Top score {score:.2f}, 24h change {change:.2f}%."}
+
+class SimulatedExecutor:
+    """
+    Deterministic fills at the snapshot price plus slippage and fees, against a cash balance
+    and per-asset positions. Returns results shaped like trade_executor.execute_trade.
+    """
+    def __init__(self, starting_cash=10000.0, fee_bps=10.0, slippage_bps=5.0):
+        self.cash = starting_cash
+        self.positions = {}
+        self.fee_rate = fee_bps / 10000
+        self.slippage_rate = slippage_bps / 10000
+
+    def execute_trade(self, symbol, decision, amount, price):
+        outcome = {'symbol': symbol, 'action': decision, 'amount': amount, 'status': 'executed', 'result': None, 'error': None, 'elapsed': 0.0}
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            amount = 0.0
+        if not price or amount <= 0:
+            outcome.update(status='failed', error='no price' if not price else f"invalid amount {outcome['amount']}")
+            return outcome
+        if decision == 'Buy':
+            fill = price * (1 + self.slippage_rate)
+            cost = fill * amount * (1 + self.fee_rate)
+            if cost > self.cash:
+                outcome.update(status='skipped', error='insufficient cash')
+                return outcome
+            self.cash -= cost
+            self.positions[symbol] = self.positions.get(symbol, 0.0) + amount
+        else:
+            held = self.positions.get(symbol, 0.0)
+            if held <= 0:
+                outcome.update(status='skipped', error='no position')
+                return outcome
+            amount = min(amount, held)
+            fill = price * (1 - self.slippage_rate)
+            self.cash += fill * amount * (1 - self.fee_rate)
+            self.positions[symbol] = held - amount
+        outcome['amount'] = amount
+        outcome['result'] = {'price': price, 'fill_price': fill}
+        return outcome
+
+    def equity(self, prices):
+        return self.cash + sum(qty * (prices.get(symbol) or 0.0) for symbol, qty in self.positions.items())
+
+class BacktestEngine:
+    """
+    Replays recorded snapshots through the live decision path (score_assets, strategy.decide
+    with PortfolioService resolution and learning-layer gating) without network access or
+    wall-clock waits.
+
+    Trades are recorded in an in-memory TradeStore; each trade's outcome is its signed return
+    `outcome_horizon` snapshots later, which feeds the win-rate skip rule as live outcomes would.
+    Optional daily limits are applied by snapshot date.
+    """
+    def __init__(self, infer=None, weights=None, normalization='none', top_k=PROMPT_ASSETS, skip_rule=None,
+                 starting_cash=10000.0, fee_bps=10.0, slippage_bps=5.0, outcome_horizon=1,
+                 per_asset_daily=None, overall_daily=None):
+        self.infer = infer or MomentumGaiaStub()
+        self.weights = weights
+        self.normalization = normalization
+        self.top_k = top_k
+        self.skip_rule = skip_rule
+        self.executor = SimulatedExecutor(starting_cash, fee_bps, slippage_bps)
+        self.starting_cash = starting_cash
+        self.outcome_horizon = outcome_horizon
+        self.per_asset_daily = per_asset_daily
+        self.overall_daily = overall_daily
+        self.store = TradeStore(':memory:')
+        self.source = SnapshotPortfolio()
+        self.portfolio = PortfolioService(self.source, ttl=float('inf'))
+
+    def _within_limits(self, asset, day_counts):
+        if self.overall_daily is not None and sum(day_counts.values()) >= self.overall_daily:
+            return False
+        return self.per_asset_daily is None or day_counts.get(asset, 0) < self.per_asset_daily
+
+    async def run(self, snapshots):
+        """
+        Replay `snapshots` in order and return a report dict.
+        """
+        notes = {}
+        trades = []
+        pending = []  # (due cycle, trade id, asset, sign, entry price)
+        equity_curve = []
+        day, day_counts = None, {}
+        cycle = -1
+        for cycle, snapshot in enumerate(snapshots):
+            prices = snapshot_prices(snapshot)
+            while pending and pending[0][0] <= cycle:
+                _, trade_id, asset, sign, entry = pending.pop(0)
+                if prices.get(asset):
+                    self.store.update_outcome(trade_id, sign * (prices[asset] / entry - 1))
+            self.source.snapshot = snapshot
+            await self.portfolio.get(force=True)
+            scored = score_assets(snapshot['markets'], weights=self.weights, normalization=self.normalization, top_k=self.top_k)
+            decision, note = await decide(scored, self.infer, self.portfolio.resolve, self.store.get_asset_stats, self.skip_rule)
+            if note:
+                tag = note.split(']', 1)[0].lstrip('[')
+                notes[tag] = notes.get(tag, 0) + 1
+            if decision is not None:
+                asset = decision['asset']
+                if snapshot['timestamp'][:10] != day:
+                    day, day_counts = snapshot['timestamp'][:10], {}
+                if not self._within_limits(asset, day_counts):
+                    notes['LIMIT'] = notes.get('LIMIT', 0) + 1
+                else:
+                    outcome = self.executor.execute_trade(asset, decision['action'], decision['amount'], prices.get(asset))
+                    if outcome['status'] == 'executed':
+                        day_counts[asset] = day_counts.get(asset, 0) + 1
+                        trade_id = self.store.record_trade(
+                            asset, decision['action'], outcome['amount'], decision['reasoning'], timestamp=snapshot['timestamp']
+                        )
+                        sign = 1 if decision['action'] == 'Buy' else -1
+                        pending.append((cycle + self.outcome_horizon, trade_id, asset, sign, prices[asset]))
+                        trades.append({'timestamp': snapshot['timestamp'], 'asset': asset, 'action': decision['action'],
+                                       'amount': outcome['amount'], 'price': prices[asset]})
+                    else:
+                        notes[outcome['status'].upper()] = notes.get(outcome['status'].upper(), 0) + 1
+            equity_curve.append(self.executor.equity(prices))
+        return self._report(cycle + 1, trades, notes, equity_curve)
+
+    def _report(self, cycles, trades, notes, equity_curve):
+        outcomes = [row[0] for row in self.store.conn.execute('SELECT outcome FROM trades WHERE outcome IS NOT NULL')]
+        peak, max_drawdown = self.starting_cash, 0.0
+        for equity in equity_curve:
+            peak = max(peak, equity)
+            max_drawdown = max(max_drawdown, (peak - equity) / peak if peak else 0.0)
+        final = equity_curve[-1] if equity_curve else self.starting_cash
+        return {
+            'cycles': cycles,
+            'trades': len(trades),
+            'notes': notes,
+            'final_equity': final,
+            'total_return': final / self.starting_cash - 1,
+            'max_drawdown': max_drawdown,
+            'win_rate': sum(o > 0 for o in outcomes) / len(outcomes) if outcomes else None,
+            'avg_return': sum(outcomes) / len(outcomes) if outcomes else None,
+            'equity_curve': equity_curve,
+            'trade_log': trades,
+        }
+
+def run_backtest(snapshots, **options):
+    """
+    Synchronous wrapper: BacktestEngine(**options).run(snapshots).
+    """
+    engine = BacktestEngine(**options)
+    try:
+        return asyncio.run(engine.run(snapshots))
+    finally:
+        engine.store.close()
+
+if __name__ == "__main__":
+    config = load_config()
+    parser = argparse.ArgumentParser(description='Replay recorded market snapshots through the trade cycle.')
+    parser.add_argument('path', nargs='?', default=(config.get('backtest') or {}).get('snapshot_dir', SNAPSHOT_DIR))
+    parser.add_argument('--normalization', default=(config.get('scoring') or {}).get('normalization', 'none'))
+    parser.add_argument('--horizon', type=int, default=1, help='snapshots until a trade outcome is measured')
+    parser.add_argument('--cash', type=float, default=10000.0)
+    parser.add_argument('--limits', action='store_true', help='apply the daily trade limits from config.yaml')
+    args = parser.parse_args()
+    limits = config.get('trade_limits') or {}
+    report = run_backtest(
+        load_snapshots(args.path),
+        weights=(config.get('scoring') or {}).get('weights'),
+        normalization=args.normalization,
+        top_k=(config.get('scoring') or {}).get('top_k', PROMPT_ASSETS),
+        starting_cash=args.cash,
+        outcome_horizon=args.horizon,
+        per_asset_daily=limits.get('per_asset_daily') if args.limits else None,
+        overall_daily=limits.get('overall_daily') if args.limits else None,
+    )
+    report.pop('equity_curve')
+    report.pop('trade_log')
+    print(json.dumps(report, indent=2))
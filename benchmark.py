@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import coingecko_client
+import main
+from cache import get_market_cache
+from coingecko_client import fetch_top_ethereum_assets, score_assets
+from gaia_client import get_gaia_client
+from gaia_prompt_utils import construct_gaia_prompt
+from journal import get_journal_writer
+from metrics import metrics
+from mock_server import MockServer
+from portfolio_service import get_portfolio_service
+from recall_sandbox_client import get_recall_client
+from strategy import PROMPT_ASSETS
+from trade_counter import TradeLimiter
+from trade_executor import execute_trade
+
+BENCHMARK_DIR = 'logs/benchmarks'
+# A p50 or p99 this much slower than the baseline is reported as a regression
+REGRESSION_THRESHOLD = 0.2
+# Cold `import main` must stay under this; the agent is restarted often in containers and backtests
+IMPORT_BUDGET_MS = 500
+
+def point_at(server):
+    """
+    Route the shared CoinGecko, Recall and Gaia clients to a MockServer.
+    """
+    urls = server.urls
+    coingecko_client.COINGECKO_MARKETS_URL = urls['coingecko_markets_url']
+    get_recall_client().api_url = urls['recall_api_url']
+    gaia_client = get_gaia_client()
+    gaia_client.gaia_url = urls['gaia_url']
+    gaia_client._client = None
+    # Benchmarks trade far more often than the live limits allow
+    main.agent.limiter = TradeLimiter(float('inf'), float('inf'))
+
+def measure_import(module='main', runs=3):
+    """
+    Time a cold `import module` in fresh interpreters with -X importtime.
+    Returns the best cumulative time in ms and the slowest top-level packages it pulled in.
+    """
+    best, heaviest = None, None
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                              capture_output=True, text=True, check=True)
+        packages = {}
+        total = None
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            name = name.strip()
+            if name == module:
+                total = int(cumulative) / 1000
+            elif '.' not in name:
+                packages[name] = max(packages.get(name, 0), int(cumulative) / 1000)
+        if total is not None and (best is None or total < best):
+            best = total
+            heaviest = dict(sorted(packages.items(), key=lambda item: -item[1])[:5])
+    return {'module': module, 'ms': best, 'heaviest_ms': heaviest}
+
+def check_import_budget(result, budget_ms=IMPORT_BUDGET_MS):
+    """
+    Print the import time against the budget; returns True when it is within budget.
+    """
+    top = ', '.join(f'{name} {ms:.0f}ms' for name, ms in result['heaviest_ms'].items())
+    print(f"import {result['module']:<7} {result['ms']:8.1f}ms  budget {budget_ms}ms  (heaviest: {top})", file=sys.__stdout__)
+    if result['ms'] > budget_ms:
+        print(f"[REGRESSION] import {result['module']} took {result['ms']:.0f}ms, over the {budget_ms}ms budget")
+        return False
+    return True
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def measure(name, fn, iterations, concurrency=1, warm=False, **labels):
+    """
+    Call the coroutine function `fn` `iterations` times, `concurrency` at a time, and summarize
+    per-call latency (p50/p99/mean), throughput, errors and peak RSS.
+    Caches are cleared before each call unless `warm`.
+    """
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one():
+        nonlocal errors
+        async with semaphore:
+            if not warm:
+                get_market_cache().invalidate()
+                get_portfolio_service().invalidate()
+            started = time.perf_counter()
+            try:
+                await fn()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(iterations)))
+    wall = time.perf_counter() - started
+    samples = np.array(latencies) * 1000
+    result = {
+        'name': name,
+        **labels,
+        'concurrency': concurrency,
+        'iterations': iterations,
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(samples.mean()),
+        'throughput': iterations / wall if wall else None,
+        'errors': errors,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+    print(f"{name:<12} assets={labels.get('assets', '-'):<5} c={concurrency:<3} p50 {result['p50_ms']:8.2f}ms  "
+          f"p99 {result['p99_ms']:8.2f}ms  {result['throughput']:8.1f}/s  errors {errors}  rss {result['peak_rss_mb']:.0f}MB",
+          file=sys.__stdout__)
+    return result
+
+async def run_suite(asset_counts, concurrency_levels, iterations, warm=False):
+    results = []
+    gaia_client = get_gaia_client()
+    portfolio_service = get_portfolio_service()
+    for n in asset_counts:
+        main.agent.universe = n
+        assets = await fetch_top_ethereum_assets(per_page=n, cache=None)
+        scored = score_assets(assets, top_k=PROMPT_ASSETS)
+        prompt = construct_gaia_prompt(scored, n=3)
+        symbol = assets[1]['symbol'].upper() if len(assets) > 1 else 'ETH'
+        components = [
+            ('fetch', lambda: fetch_top_ethereum_assets(per_page=n, cache=None)),
+            ('score', lambda: asyncio.sleep(0, score_assets(assets, top_k=PROMPT_ASSETS))),
+            ('prompt', lambda: asyncio.sleep(0, construct_gaia_prompt(scored, n=3))),
+            ('gaia', lambda: gaia_client.gaia_infer_from_prompt(prompt)),
+            ('portfolio', lambda: portfolio_service.get(force=True)),
+            ('execute', lambda: execute_trade(symbol, 'Buy')),
+        ]
+        for name, fn in components:
+            results.append(await measure(name, fn, iterations, warm=warm, assets=n))
+        # Warm-up: the first cycle starts the chart render worker
+        await main.trade_cycle()
+        for c in concurrency_levels:
+            results.append(await measure('trade_cycle', main.trade_cycle, iterations, concurrency=c, warm=warm, assets=n))
+    return results
+
+def compare(results, baseline_path):
+    """
+    Print p50/p99 changes against a previous benchmark JSON; returns the regressed entries.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r['name'], r.get('assets'), r['concurrency']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get((result['name'], result.get('assets'), result['concurrency']))
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            change = result[metric] / before[metric] - 1 if before[metric] else 0.0
+            if change > REGRESSION_THRESHOLD:
+                regressions.append({'name': result['name'], 'assets': result.get('assets'), 'concurrency': result['concurrency'],
+                                    'metric': metric, 'before': before[metric], 'after': result[metric]})
+                print(f"[REGRESSION] {result['name']} assets={result.get('assets')} c={result['concurrency']} "
+                      f"{metric} {before[metric]:.2f}ms -> {result[metric]:.2f}ms ({change:+.0%})")
+    return regressions
+
+async def run(args):
+    server = MockServer(assets=max(args.assets), latency={'default': args.latency, 'chat': args.gaia_latency},
+                        error_rate=args.error_rate, seed=args.seed).start()
+    point_at(server)
+    journal_writer = get_journal_writer()
+    await journal_writer.start()
+    try:
+        # The agent's own trade logging is muted unless --verbose
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else open(os.devnull, 'w')):
+            async with get_recall_client(), get_gaia_client() as gaia_client:
+                # openai is imported on first use; keep that one-off cost out of the Gaia timings
+                gaia_client.client
+                results = await run_suite(args.assets, args.concurrency, args.iterations, warm=args.warm)
+    finally:
+        await journal_writer.close()
+        main.chart_service.close()
+        server.stop()
+    return results, server.requests
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the trade cycle against the local mock APIs.')
+    parser.add_argument('--assets', type=int, nargs='+', default=[10, 50, 250])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.005, help='mock API latency in seconds')
+    parser.add_argument('--gaia-latency', type=float, default=0.05, help='mock chat-completion latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--warm', action='store_true', help='keep caches between iterations')
+    parser.add_argument('--metrics', action='store_true', help='enable instrumentation and include it in the report')
+    parser.add_argument('--verbose', action='store_true', help="show the agent's own output")
+    parser.add_argument('--compare', help='previous benchmark JSON to check for regressions')
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_MS, help='cold `import main` budget in ms')
+    parser.add_argument('--import-only', action='store_true', help='only run the import-time check')
+    args = parser.parse_args()
+    metrics.enabled = args.metrics
+    # Measured first, from the repository, so nothing this process imported is reused
+    import_result = measure_import('main')
+    within_budget = check_import_budget(import_result, args.import_budget)
+    if args.import_only:
+        sys.exit(0 if within_budget else 1)
+    output_dir = os.path.abspath(BENCHMARK_DIR)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    # Journals, charts, trade counts and the learning DB go to a scratch directory
+    workdir = tempfile.mkdtemp(prefix='benchmark_')
+    for name in os.listdir('.'):
+        if name == 'config.yaml' or name.endswith('.j2'):
+            shutil.copy(name, workdir)
+    os.chdir(workdir)
+    try:
+        results, requests = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = {'timestamp': datetime.utcnow().isoformat() + 'Z', 'args': vars(args), 'requests': requests, 'results': results,
+              'import': import_result}
+    if metrics.enabled:
+        report['metrics'] = metrics.snapshot()
+    if baseline:
+        report['regressions'] = compare(results, baseline)
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"benchmark_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report: {path}")
+    if not within_budget:
+        sys.exit(1)
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from metrics import metrics
+from settings import load_config
+
+DEFAULT_TTLS = {
+    'coingecko_markets': 60,
+    'recall_price': 15,
+    'recall_token_info': 300,
+}
+
+class AsyncTTLCache:
+    """
+    Async memoization for API lookups.
+    - Entries expire after a per-endpoint TTL (`ttls`, falling back to `default_ttl`).
+    - For `stale_ttl` seconds past expiry a stale value is still served while one
+      background refresh runs (stale-while-revalidate).
+    - Concurrent misses for the same key share a single in-flight fetch.
+    - At most `max_entries` are kept, evicting the least recently used.
+    - With `path` set, entries can be saved to and reloaded from a JSON file.
+    """
+    def __init__(self, ttls=None, default_ttl=30, stale_ttl=120, max_entries=2048, path=None):
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._inflight = {}
+        self._refreshing = set()
+        self._tasks = set()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0}
+        if path:
+            self.load()
+
+    def metrics(self):
+        """
+        Hit/miss counters plus the overall hit rate (fresh and stale hits over all lookups).
+        """
+        hits = self.stats['hits'] + self.stats['stale_hits']
+        lookups = hits + self.stats['misses']
+        return {**self.stats, 'entries': len(self._entries), 'hit_rate': hits / lookups if lookups else None}
+
+    def _ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def _store(self, key, value):
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch(self, key, fetch):
+        # Coalesce: every caller for this key awaits the same future
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            metrics.inc('cache_requests_total', endpoint=key.split('|', 1)[0], result='coalesced')
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not log a warning
+            future.exception()
+            raise
+        else:
+            self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _refresh(self, key, fetch):
+        try:
+            await self._fetch(key, fetch)
+        except Exception as e:
+            print(f"[WARN] Background cache refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def get_or_fetch(self, endpoint, params, fetch):
+        """
+        Return the cached value for (endpoint, params), calling the coroutine function `fetch` when needed.
+        `params` is any JSON-serializable description of the request.
+        """
+        key = f"{endpoint}|{json.dumps(params, sort_keys=True, default=str)}"
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            ttl = self._ttl(endpoint)
+            if age < ttl:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                metrics.inc('cache_requests_total', endpoint=endpoint, result='hit')
+                return entry[1]
+            if age < ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stats['stale_hits'] += 1
+                metrics.inc('cache_requests_total', endpoint=endpoint, result='stale')
+                if key not in self._refreshing and key not in self._inflight:
+                    self._refreshing.add(key)
+                    task = asyncio.get_running_loop().create_task(self._refresh(key, fetch))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                return entry[1]
+        self.stats['misses'] += 1
+        metrics.inc('cache_requests_total', endpoint=endpoint, result='miss')
+        return await self._fetch(key, fetch)
+
+    def invalidate(self, endpoint=None):
+        if endpoint is None:
+            self._entries.clear()
+            return
+        prefix = f"{endpoint}|"
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump([[k, ts, v] for k, (ts, v) in self._entries.items()], f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r') as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Ignoring unreadable cache file {path}: {e}")
+            return
+        for key, ts, value in rows:
+            self._entries[key] = (ts, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+def build_cache(config):
+    """
+    Build an AsyncTTLCache from the `cache` section of config.yaml.
+    """
+    opts = config.get('cache') or {}
+    return AsyncTTLCache(
+        ttls=opts.get('ttls'),
+        default_ttl=opts.get('default_ttl', 30),
+        stale_ttl=opts.get('stale_ttl', 120),
+        max_entries=opts.get('max_entries', 2048),
+        path=opts.get('path'),
+    )
+
+# Shared market-data cache for CoinGecko and Recall lookups, loaded from disk on first use
+_market_cache = None
+
+def get_market_cache():
+    global _market_cache
+    if _market_cache is None:
+        _market_cache = build_cache(load_config())
+    return _market_cache
+
+def __getattr__(name):
+    # `from cache import market_cache` still works, and builds the cache on first access
+    if name == 'market_cache':
+        return get_market_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
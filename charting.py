@@ -1,40 +1,144 @@
+import asyncio
+import hashlib
+import json
 import os
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from metrics import metrics
 
-def generate_chart_snapshot(symbol, history):
-    """
-    Generate a price/volume chart for the asset using its history and save as PNG.
-    Returns the file path to the saved chart, or None if not enough data.
-    """
-    if not history or len(history) < 2:
-        return None
+CHART_DIR = os.path.join('logs', 'charts')
+MAX_REMEMBERED_CHARTS = 256
+
+# Figure and axes reused across renders in this process (one per render worker).
+# matplotlib is imported here, on the first render, rather than when the agent starts.
+_figure = None
+
+def _get_figure():
+    global _figure
+    if _figure is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(8, 4))
+        FigureCanvasAgg(fig)
+        ax1 = fig.add_subplot()
+        ax2 = ax1.twinx()
+        _figure = (fig, ax1, ax2)
+    return _figure
+
+def _render(symbol, history, fpath):
     timestamps = [h['timestamp'] for h in history]
     prices = [h['price'] for h in history]
     volumes = [h['volume'] for h in history]
-    # Prepare output directory
-    chart_dir = os.path.join('logs', 'charts')
-    os.makedirs(chart_dir, exist_ok=True)
-    # File name with timestamp
-    fname = f"{symbol}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.png"
-    fpath = os.path.join(chart_dir, fname)
-    # Plot
-    fig, ax1 = plt.subplots(figsize=(8, 4))
+    fig, ax1, ax2 = _get_figure()
+    ax1.clear()
+    ax2.clear()
+    ax2.yaxis.tick_right()
+    ax2.yaxis.set_label_position('right')
+    ax2.patch.set_visible(False)
     color = 'tab:blue'
     ax1.set_xlabel('Time')
     ax1.set_ylabel('Price', color=color)
     ax1.plot(timestamps, prices, color=color, marker='o', label='Price')
     ax1.tick_params(axis='y', labelcolor=color)
     ax1.legend(loc='upper left')
-    ax2 = ax1.twinx()
     color = 'tab:orange'
     ax2.set_ylabel('Volume', color=color)
     ax2.bar(timestamps, volumes, color=color, alpha=0.3, label='Volume')
     ax2.tick_params(axis='y', labelcolor=color)
     ax2.legend(loc='upper right')
-    plt.title(f"{symbol} Price & Volume History")
-    plt.xticks(rotation=45, ha='right', fontsize=8)
-    plt.tight_layout()
-    plt.savefig(fpath)
-    plt.close(fig)
-    return fpath 
\ No newline at end of file
+    ax2.set_title(f"{symbol} Price & Volume History")
+    ax1.tick_params(axis='x', labelrotation=45, labelsize=8)
+    for label in ax1.get_xticklabels():
+        label.set_horizontalalignment('right')
+    fig.tight_layout()
+    fig.savefig(fpath)
+    return fpath
+
+def _chart_path(symbol, chart_dir=CHART_DIR):
+    os.makedirs(chart_dir, exist_ok=True)
+    # File name with timestamp
+    fname = f"{symbol}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.png"
+    return os.path.join(chart_dir, fname)
+
+def generate_chart_snapshot(symbol, history):
+    """
+    Generate a price/volume chart for the asset using its history and save as PNG.
+    Returns the file path to the saved chart, or None if not enough data.
+    """
+    if not history or len(history) < 2:
+        return None
+    return _render(symbol, history, _chart_path(symbol))
+
+def _init_worker():
+    # Render workers never need a GUI backend
+    import matplotlib
+    matplotlib.use('Agg')
+
+class ChartRenderService:
+    """
+    Renders chart snapshots in a separate process so the event loop never blocks on matplotlib.
+    Each worker keeps one figure alive between renders, and a history window that was already
+    rendered returns the existing file instead of drawing it again.
+    """
+    def __init__(self, max_workers=1, chart_dir=CHART_DIR):
+        self.max_workers = max_workers
+        self.chart_dir = chart_dir
+        self._pool = None
+        self._rendered = {}  # content hash -> chart path
+        self._pending = {}  # content hash -> future
+        self._tasks = set()
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+        return self._pool
+
+    @staticmethod
+    def content_hash(symbol, history):
+        payload = json.dumps([symbol, history], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    async def render(self, symbol, history):
+        """
+        Render a chart for the history window and return its path (None if fewer than two points).
+        """
+        if not history or len(history) < 2:
+            return None
+        key = self.content_hash(symbol, history)
+        path = self._rendered.get(key)
+        if path and os.path.exists(path):
+            metrics.inc('chart_requests_total', result='cached')
+            return path
+        future = self._pending.get(key)
+        if future is None:
+            metrics.inc('chart_requests_total', result='rendered')
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor(), _render, symbol, history, _chart_path(symbol, self.chart_dir))
+            self._pending[key] = future
+        else:
+            metrics.inc('chart_requests_total', result='coalesced')
+        try:
+            with metrics.span('chart_render'):
+                path = await asyncio.shield(future)
+        finally:
+            self._pending.pop(key, None)
+        self._rendered[key] = path
+        if len(self._rendered) > MAX_REMEMBERED_CHARTS:
+            self._rendered.pop(next(iter(self._rendered)))
+        return path
+
+    def submit(self, symbol, history):
+        """
+        Start rendering in the background. Returns a task to await for the path, or to ignore.
+        """
+        task = asyncio.get_running_loop().create_task(self.render(symbol, history))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+chart_service = ChartRenderService()
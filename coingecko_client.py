@@ -1,8 +1,14 @@
-import httpx
+from cache import get_market_cache
+from metrics import metrics
+from scoring import build_columns, score_columns, top_k_indices
+from settings import load_config
 
-COINGECKO_MARKETS_URL = "https://api.coingecko.com/api/v3/coins/markets"
+# Overridable in config.yaml, e.g. to point at mock_server.py
+COINGECKO_MARKETS_URL = load_config().get('coingecko_markets_url') or "https://api.coingecko.com/api/v3/coins/markets"
+# Default for `cache`: the shared market_cache (pass cache=None to bypass caching)
+SHARED_CACHE = 'shared'
 
-async def fetch_top_ethereum_assets(vs_currency="usd", per_page=50):
+async def fetch_top_ethereum_assets(vs_currency="usd", per_page=50, cache=SHARED_CACHE):
     params = {
         "vs_currency": vs_currency,
         "platform": "ethereum",
@@ -11,30 +17,33 @@ async def fetch_top_ethereum_assets(vs_currency="usd", per_page=50):
         "page": 1,
         "price_change_percentage": "1h,24h,7d"
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(COINGECKO_MARKETS_URL, params=params)
-        resp.raise_for_status()
-        return resp.json()
 
-def score_assets(assets, price_change_key="price_change_percentage_24h_in_currency", volume_key="total_volume", high_key="high_24h", low_key="low_24h"):
+    async def _fetch():
+        import httpx
+        metrics.inc('api_requests_total', api='coingecko', endpoint='/coins/markets')
+        with metrics.span('api_request', api='coingecko', endpoint='/coins/markets'):
+            async with httpx.AsyncClient() as client:
+                resp = await client.get(COINGECKO_MARKETS_URL, params=params)
+                resp.raise_for_status()
+                return resp.json()
+    if cache is None:
+        return await _fetch()
+    if cache is SHARED_CACHE:
+        cache = get_market_cache()
+    return await cache.get_or_fetch('coingecko_markets', params, _fetch)
+
+def score_assets(assets, price_change_key="price_change_percentage_24h_in_currency", volume_key="total_volume", high_key="high_24h", low_key="low_24h", weights=None, normalization='none', top_k=None):
     """
     Score and rank assets by price change, volume, and volatility.
+    `weights` overrides scoring.DEFAULT_WEIGHTS, `normalization` is one of 'none', 'zscore', 'rank',
+    and `top_k` limits the result to the k best assets.
     Returns a sorted list of (asset, score) tuples, descending.
     """
-    scored = []
-    for asset in assets:
-        # Heuristic: weighted sum of normalized metrics
-        price_change = abs(asset.get(price_change_key, 0) or 0)
-        volume = asset.get(volume_key, 0) or 0
-        high = asset.get(high_key, 0) or 0
-        low = asset.get(low_key, 0) or 0
-        volatility = (high - low) / asset["current_price"] if asset["current_price"] else 0
-        # Simple scoring: price change (weight 2), volume (weight 1), volatility (weight 1)
-        score = 2 * price_change + 1 * (volume / 1e6) + 1 * volatility
-        scored.append((asset, score))
-    # Sort descending by score
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored
+    if not assets:
+        return []
+    columns = build_columns(assets, price_change_key, volume_key, high_key, low_key)
+    scores = score_columns(columns, weights, normalization)
+    return [(assets[i], float(scores[i])) for i in top_k_indices(scores, top_k)]
 
 # Example usage:
 # import asyncio
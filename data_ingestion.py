@@ -1,24 +1,133 @@
-from recall_sandbox_client import RecallSandboxClient
-import yaml
+import asyncio
+import time
+from urllib.parse import urlparse
+from portfolio_service import PortfolioService, get_portfolio_service
+from recall_sandbox_client import get_recall_client
 
-with open('config.yaml') as f:
-    config = yaml.safe_load(f)
+DEFAULT_CONCURRENCY = 10
+DEFAULT_RATE_PER_SECOND = 20.0
 
-recall_client = RecallSandboxClient({
-    'recall_api_url': config.get('recall_api_url', 'https://api.sandbox.competitions.recall.network/api'),
-    'recall_api_key': config['api_keys']['recall']
-})
+class RateLimiter:
+    """
+    Token-bucket limiter: allows `rate` acquisitions per second with bursts up to `burst`.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+# One limiter per remote host, shared by every batch in the process
+_host_limiters = {}
+
+def get_host_limiter(url, rate=DEFAULT_RATE_PER_SECOND):
+    """
+    The shared limiter for `url`'s host. The host has one budget, so asking for a different
+    rate than the existing limiter's is an error rather than a second, separate budget.
+    """
+    host = urlparse(url).netloc or url
+    limiter = _host_limiters.get(host)
+    if limiter is None:
+        limiter = _host_limiters[host] = RateLimiter(rate)
+    elif limiter.rate != float(rate):
+        raise ValueError(f"Rate limiter for {host} already runs at {limiter.rate}/s, not {rate}/s")
+    return limiter
+
+def _asset_address(asset, addresses):
+    # Accept Recall-style dicts, CoinGecko markets rows, and (asset, score) tuples from score_assets.
+    # CoinGecko /coins/markets rows carry no contract address, so those resolve through `addresses` by symbol.
+    if isinstance(asset, tuple):
+        asset = asset[0]
+    address = asset.get('address') or asset.get('contract_address')
+    if not address:
+        address = (asset.get('platforms') or {}).get('ethereum')
+    if not address:
+        address = addresses.get((asset.get('symbol') or '').upper())
+    return asset, address
+
+async def recall_token_addresses(portfolio=None):
+    """
+    {SYMBOL: token address} for the tokens in the Recall portfolio.
+    """
+    portfolio = portfolio or get_portfolio_service()
+    await portfolio.get()
+    return {symbol: token['token'] for symbol, token in portfolio.by_symbol.items() if token.get('token')}
 
 async def fetch_multi_asset_data(asset):
     # asset is a dict with 'symbol' and 'address'
     address = asset['address']
     symbol = asset['symbol']
-    price_data = await recall_client.get_token_price(address)
-    token_info = await recall_client.get_token_info(address)
+    recall_client = get_recall_client()
+    price_data, token_info = await asyncio.gather(
+        recall_client.get_token_price(address),
+        recall_client.get_token_info(address),
+    )
     return {
         'symbol': symbol,
         'address': address,
         'price': price_data.get('price'),
         'volume': token_info.get('volume', 0.0),
         'on_chain': token_info.get('on_chain', {})
-    } 
\ No newline at end of file
+    }
+
+async def fetch_multi_asset_batch(assets, concurrency=DEFAULT_CONCURRENCY, rate_per_second=DEFAULT_RATE_PER_SECOND, client=None,
+                                  addresses=None, portfolio=None):
+    """
+    Fetch price and token info for many assets concurrently.
+    Assets without an address of their own (e.g. CoinGecko markets rows) are looked up by symbol in
+    `addresses`, which defaults to the Recall portfolio's tokens (from `portfolio`, or a PortfolioService
+    over `client`). This is a library helper; the trade cycle does not call it.
+    At most `concurrency` assets are in flight, and requests to the Recall host are
+    rate limited. A failure for one asset is recorded in its `error` slot instead of
+    failing the batch.
+    Returns a columnar dict: symbol, address, price, volume, on_chain, error (lists of equal length).
+    """
+    if addresses is None:
+        if portfolio is None:
+            portfolio = PortfolioService(client) if client is not None else get_portfolio_service()
+        addresses = await recall_token_addresses(portfolio)
+    client = client or get_recall_client()
+    limiter = get_host_limiter(client.api_url, rate_per_second)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _limited(call, address):
+        await limiter.acquire()
+        return await call(address)
+
+    async def _fetch_one(asset):
+        asset, address = _asset_address(asset, addresses)
+        symbol = (asset.get('symbol') or '').upper()
+        if not address:
+            return symbol, None, None, None, {}, 'missing token address'
+        async with semaphore:
+            try:
+                price_data, token_info = await asyncio.gather(
+                    _limited(client.get_token_price, address),
+                    _limited(client.get_token_info, address),
+                )
+            except Exception as e:
+                message = str(e).splitlines()[0] if str(e) else ''
+                return symbol, address, None, None, {}, f"{type(e).__name__}: {message}"
+        return symbol, address, price_data.get('price'), token_info.get('volume', 0.0), token_info.get('on_chain', {}), None
+
+    rows = await asyncio.gather(*(_fetch_one(a) for a in assets))
+    columns = {'symbol': [], 'address': [], 'price': [], 'volume': [], 'on_chain': [], 'error': []}
+    for row in rows:
+        for key, value in zip(columns, row):
+            columns[key].append(value)
+    failed = sum(1 for e in columns['error'] if e)
+    if failed:
+        print(f"[WARN] Market data fetch failed for {failed}/{len(rows)} assets.")
+    return columns
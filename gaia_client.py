@@ -1,101 +1,265 @@
-import openai
-import jinja2
+import asyncio
+import inspect
 import json
-import yaml
+import re
+from cache import AsyncTTLCache
+from gaia_prompt_utils import get_template
+from metrics import metrics
+from settings import load_config
+
+SYSTEM_PROMPT = "You are a creative, painterly trading agent. Respond ONLY in valid JSON."
+DECISION_FIELDS = ('asset', 'action', 'amount')
+# A complete "field": value pair; numbers need a terminator so a partial "12" is not taken for "125"
+_FIELD_RE = re.compile(r'"(asset|action|amount)"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?=\s*[,}\n]))')
+
+def _load_json(content):
+    # Models sometimes wrap the JSON object in prose or code fences
+    try:
+        return json.loads(content)
+    except ValueError:
+        start, end = content.find('{'), content.rfind('}')
+        if start == -1 or end <= start:
+            raise
+        return json.loads(content[start:end + 1])
+
+def extract_decision_fields(partial):
+    """
+    Pull whichever of asset/action/amount are already complete in a partial JSON response.
+    """
+    return {name: json.loads(value) for name, value in _FIELD_RE.findall(partial)}
+
+class UnparsedResponse(ValueError):
+    """
+    Gaia replied with something that is not a decision.
+    """
+    def __init__(self, content):
+        super().__init__("Failed to parse Gaia response")
+        self.content = content
+
+def _decision(content):
+    # Raises on malformed content
+    result = _load_json(content)
+    return {
+        "asset": result.get('asset'),
+        "action": result.get('action', 'Hold').capitalize(),
+        "amount": result.get('amount', 1),
+        "reason": result.get('reason', ''),
+    }
+
+def _parse_failure(content):
+    return {"asset": None, "action": "Hold", "amount": 1, "reason": f"Failed to parse Gaia response: {content}"}
+
+def parse_decision(content):
+    """
+    Parse a Gaia response into a dict with keys: asset, action, amount, reason.
+    A malformed response becomes a Hold decision whose reason holds the raw content.
+    """
+    try:
+        return _decision(content)
+    except Exception:
+        return _parse_failure(content)
 
 class GaiaClient:
-    def __init__(self, config):
+    def __init__(self, config, http_client=None, decision_cache=None):
         self.gaia_url = config.get('gaia_url', 'https://qwen72b.gaia.domains/v1')
         self.gaia_api_key = config.get('gaia_api_key', 'YOUR_API_KEY')
         self.model = config.get('gaia_model', 'llama')
         self.prompt_template_path = config.get('prompt_template', 'prompt_template.j2')
-        with open(self.prompt_template_path, 'r') as f:
-            self.prompt_template = jinja2.Template(f.read())
-        self.client = openai.OpenAI(
-            base_url=self.gaia_url,
-            api_key=self.gaia_api_key
+        self.max_concurrency = config.get('max_concurrency', 4)
+        self.stream = config.get('stream', False)
+        self.timeout = config.get('timeout', 60.0)
+        self._prompt_template = None
+        self._client = None
+        # An injected httpx client is shared with its owner and never closed here
+        self._http_client = http_client
+        # Decisions keyed on normalized market state; disabled when cache_ttl is 0.
+        # Agents with the same model can share one cache, since the key covers the market state and prompt version.
+        cache_ttl = config.get('cache_ttl', 0)
+        self.decision_cache = decision_cache if decision_cache is not None else AsyncTTLCache(
+            ttls={'gaia_decision': cache_ttl},
+            stale_ttl=0,
+            max_entries=config.get('cache_max_entries', 256),
+            path=config.get('cache_path'),
+        ) if cache_ttl else None
+
+    @property
+    def prompt_template(self):
+        if self._prompt_template is None:
+            self._prompt_template = get_template(self.prompt_template_path)
+        return self._prompt_template
+
+    @property
+    def client(self):
+        # Built on first use so its connection pool binds to the running loop,
+        # and so importing this module does not pay for importing openai
+        if self._client is None:
+            import openai
+            self._client = openai.AsyncOpenAI(
+                base_url=self.gaia_url,
+                api_key=self.gaia_api_key,
+                timeout=self.timeout,
+                http_client=self._http_client or self.build_http_client(),
+            )
+        return self._client
+
+    def build_http_client(self):
+        import httpx
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_concurrency * 2, max_keepalive_connections=self.max_concurrency),
+            timeout=self.timeout,
         )
 
-    async def analyze_asset(self, asset, market_data):
-        prompt = self.prompt_template.render(asset=asset, market_data=market_data)
+    async def aclose(self):
+        if self._client is not None:
+            if self._http_client is None:
+                await self._client.close()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def _complete(self, prompt, model=None, stream=None, on_decision=None):
+        """
+        Run one chat completion and return the response text.
+        When streaming, `on_decision` (a function or coroutine function) is called with
+        {asset, action, amount} as soon as those fields have arrived, before the reason finishes.
+        """
         messages = [
-            {"role": "system", "content": "You are a creative, painterly trading agent. Respond ONLY in valid JSON."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ]
-        import asyncio
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.client.chat.completions.create(
-                model=self.model,
+        stream = self.stream if stream is None else stream
+        metrics.inc('api_requests_total', api='gaia', endpoint='/chat/completions')
+        with metrics.span('api_request', api='gaia', endpoint='/chat/completions'):
+            return await self._request(messages, model, stream, on_decision)
+
+    async def _request(self, messages, model, stream, on_decision):
+        if not stream:
+            response = await self.client.chat.completions.create(
+                model=model or self.model,
                 messages=messages,
                 temperature=0.7,
                 max_tokens=500
             )
+            return response.choices[0].message.content
+        chunks = []
+        fired = on_decision is None
+        response = await self.client.chat.completions.create(
+            model=model or self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=500,
+            stream=True
         )
-        content = response.choices[0].message.content
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            chunks.append(delta)
+            if not fired:
+                fields = extract_decision_fields(''.join(chunks))
+                if all(name in fields for name in DECISION_FIELDS):
+                    fired = True
+                    fields['action'] = str(fields['action']).capitalize()
+                    early = on_decision(fields)
+                    if inspect.isawaitable(early):
+                        await early
+        return ''.join(chunks)
+
+    async def analyze_asset(self, asset, market_data, stream=None, on_decision=None):
+        prompt = self.prompt_template.render(asset=asset, market_data=market_data)
+        content = await self._complete(prompt, stream=stream, on_decision=on_decision)
         try:
-            result = json.loads(content)
+            result = _load_json(content)
         except Exception:
             result = {"error": "Failed to parse Gaia response", "raw": content}
         return result
 
-    async def gaia_infer_from_prompt(self, prompt, model=None):
+    async def analyze_assets(self, assets, market_data, concurrency=None):
+        """
+        Run analyze_asset for many assets concurrently, at most `concurrency` at a time.
+        assets: list of symbols; market_data: dict of symbol -> description.
+        Returns {symbol: result}; a failed call yields {"error": ...} for that symbol.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.max_concurrency)
+
+        async def _one(symbol):
+            async with semaphore:
+                try:
+                    return await self.analyze_asset(symbol, market_data.get(symbol, ''))
+                except Exception as e:
+                    return {"error": f"Gaia request failed: {e}"}
+
+        results = await asyncio.gather(*(_one(symbol) for symbol in assets))
+        return dict(zip(assets, results))
+
+    async def gaia_infer_from_prompt(self, prompt, model=None, stream=None, on_decision=None, cache_key=None):
         """
         Send a custom prompt to Gaia and parse the JSON response for asset, action, amount, and reason.
+        With `cache_key` (see gaia_prompt_utils.market_state_key) a recent decision for the same
+        market state is reused instead of calling the model again.
         Returns: dict with keys: asset, action, amount, reason
         """
-        messages = [
-            {"role": "system", "content": "You are a creative, painterly trading agent. Respond ONLY in valid JSON."},
-            {"role": "user", "content": prompt}
-        ]
-        mdl = model or self.model
-        import asyncio
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.client.chat.completions.create(
-                model=mdl,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500
-            )
-        )
-        content = response.choices[0].message.content
+        async def _infer():
+            content = await self._complete(prompt, model=model, stream=stream, on_decision=on_decision)
+            try:
+                return _decision(content)
+            except Exception:
+                # Raised rather than returned, so a malformed reply is never cached as a Hold
+                raise UnparsedResponse(content) from None
         try:
-            result = json.loads(content)
-            asset = result.get('asset')
-            action = result.get('action', 'Hold').capitalize()
-            amount = result.get('amount', 1)
-            reason = result.get('reason', '')
-        except Exception:
-            asset = None
-            action = 'Hold'
-            amount = 1
-            reason = f"Failed to parse Gaia response: {content}"
-        return {"asset": asset, "action": action, "amount": amount, "reason": reason}
-
-# Load config for GaiaClient singleton
-with open('config.yaml') as f:
-    config = yaml.safe_load(f)
-
-gaia_client = GaiaClient({
-    'gaia_url': config.get('gaia_url', 'https://YOUR-GAIA-DOMAIN.gaia.domains/v1'),
-    'gaia_api_key': config['api_keys']['gaia'],
-    'gaia_model': config.get('gaia_model', 'llama'),
-    'prompt_template': 'prompt_template.j2'
-})
+            if cache_key is None or self.decision_cache is None:
+                return await _infer()
+            decision = await self.decision_cache.get_or_fetch('gaia_decision', [cache_key, model or self.model], _infer)
+        except UnparsedResponse as e:
+            return _parse_failure(e.content)
+        return dict(decision)
 
-import asyncio
+    def cache_metrics(self):
+        return self.decision_cache.metrics() if self.decision_cache is not None else None
+
+    def save_cache(self):
+        if self.decision_cache is not None:
+            self.decision_cache.save()
+
+def build_gaia_client(config, http_client=None, decision_cache=None):
+    """
+    Build a GaiaClient from the agent's config.yaml contents.
+    """
+    return GaiaClient({
+        'gaia_url': config.get('gaia_url', 'https://YOUR-GAIA-DOMAIN.gaia.domains/v1'),
+        'gaia_api_key': config['api_keys']['gaia'],
+        'gaia_model': config.get('gaia_model', 'llama'),
+        'prompt_template': 'prompt_template.j2',
+        **(config.get('gaia') or {}),
+    }, http_client=http_client, decision_cache=decision_cache)
+
+_gaia_client = None
+
+def get_gaia_client():
+    global _gaia_client
+    if _gaia_client is None:
+        _gaia_client = build_gaia_client(load_config())
+    return _gaia_client
+
+def __getattr__(name):
+    # `from gaia_client import gaia_client` still works, and builds the client on first access
+    if name == 'gaia_client':
+        return get_gaia_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def get_gaia_trade_signal(symbol, visual_desc):
+async def get_gaia_trade_signal(symbol, visual_desc):
     """
     Send the painterly description to Gaia and receive a trade recommendation.
     Returns: (asset, action, amount, reasoning)
     """
     market_data = visual_desc
-    loop = asyncio.get_event_loop()
-    result = loop.run_until_complete(gaia_client.analyze_asset(symbol, market_data))
+    result = await get_gaia_client().analyze_asset(symbol, market_data)
     if isinstance(result, dict):
         asset = result.get('asset', symbol)
         action = result.get('action', 'Hold').capitalize()
@@ -106,4 +270,4 @@ def get_gaia_trade_signal(symbol, visual_desc):
         action = 'Hold'
         amount = 1
         reasoning = visual_desc
-    return asset, action, amount, reasoning 
\ No newline at end of file
+    return asset, action, amount, reasoning
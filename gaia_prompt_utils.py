@@ -1,4 +1,82 @@
 import datetime
+import functools
+import hashlib
+import json
+import math
+import os
+
+TEMPLATE_DIR = '.'
+BYTECODE_CACHE_DIR = 'logs/cache/jinja'
+
+# Bump when the wording built by construct_gaia_prompt changes, so cached decisions are not reused
+PROMPT_TEMPLATE_VERSION = 1
+# Quantization steps for the market-state cache key
+PRICE_CHANGE_STEP = 0.5  # percentage points
+VOLUME_LOG_STEP = 0.25  # log10 units
+VOLATILITY_STEP = 0.005  # (high - low) / price
+
+_environment = None
+
+def get_environment():
+    """
+    Shared Jinja environment: templates are compiled once per process and their
+    bytecode is cached on disk across restarts.
+    """
+    global _environment
+    if _environment is None:
+        import jinja2
+        os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+        _environment = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+            bytecode_cache=jinja2.FileSystemBytecodeCache(BYTECODE_CACHE_DIR),
+            auto_reload=False,
+            keep_trailing_newline=True,
+        )
+    return _environment
+
+def get_template(name):
+    return get_environment().get_template(name)
+
+def _fragment_inputs(asset):
+    return (
+        asset.get('name', 'Unknown'),
+        asset.get('symbol', '').upper(),
+        asset.get('current_price', '?'),
+        asset.get('price_change_percentage_24h_in_currency', 0),
+        asset.get('total_volume', 0),
+        asset.get('high_24h', 0),
+        asset.get('low_24h', 0),
+    )
+
+@functools.lru_cache(maxsize=4096)
+def describe_asset(name, symbol, price, change, vol, high, low):
+    """
+    Painterly one-line description of an asset, memoized on its input values.
+    """
+    return (
+        f"{name} ({symbol}) trades at ${price:.2f}, its chart forms "
+        f"{'a rising spiral' if change > 0 else 'a falling ribbon'}, "
+        f"with a 24h change of {change:+.2f}%. "
+        f"Volume swells to {vol:,.0f}, volatility dances between {low:.2f} and {high:.2f}."
+    )
+
+def render_asset_prompts(assets, market_data=None, template_name='prompt_template.j2'):
+    """
+    Render the per-asset Gaia prompt for many assets in one pass.
+    assets: CoinGecko market dicts or (asset, score) tuples.
+    market_data: optional dict of symbol -> description; defaults to describe_asset's fragment.
+    Returns {symbol: prompt}.
+    """
+    template = get_template(template_name)
+    prompts = {}
+    for asset in assets:
+        if isinstance(asset, tuple):
+            asset = asset[0]
+        inputs = _fragment_inputs(asset)
+        symbol = inputs[1]
+        description = (market_data or {}).get(symbol) or describe_asset(*inputs)
+        prompts[symbol] = template.render(asset=symbol, market_data=description)
+    return prompts
 
 def construct_gaia_prompt(scored_assets, n=3, ecosystem_summary=None):
     """
@@ -12,22 +90,7 @@ def construct_gaia_prompt(scored_assets, n=3, ecosystem_summary=None):
     if not ecosystem_summary:
         ecosystem_summary = f"As of {now}, Ethereum's DeFi and token landscape is vibrant and ever-shifting."
     # Artistic descriptions
-    descs = []
-    for asset in top_assets:
-        name = asset.get('name', 'Unknown')
-        symbol = asset.get('symbol', '').upper()
-        price = asset.get('current_price', '?')
-        change = asset.get('price_change_percentage_24h_in_currency', 0)
-        vol = asset.get('total_volume', 0)
-        high = asset.get('high_24h', 0)
-        low = asset.get('low_24h', 0)
-        metaphor = (
-            f"{name} ({symbol}) trades at ${price:.2f}, its chart forms "
-            f"{'a rising spiral' if change > 0 else 'a falling ribbon'}, "
-            f"with a 24h change of {change:+.2f}%. "
-            f"Volume swells to {vol:,.0f}, volatility dances between {low:.2f} and {high:.2f}."
-        )
-        descs.append(metaphor)
+    descs = [describe_asset(*_fragment_inputs(asset)) for asset in top_assets]
     desc_block = '\n'.join(descs)
     # Compose prompt
     prompt = (
@@ -37,4 +100,30 @@ def construct_gaia_prompt(scored_assets, n=3, ecosystem_summary=None):
         "Which asset should I trade next? Should I buy, sell, or hold, and how much? "
         "Respond in JSON with asset, action, amount, and a painterly reason."
     )
-    return prompt 
\ No newline at end of file
+    return prompt
+
+def _bucket(value, step):
+    return int(math.floor(value / step)) if value else 0
+
+def market_state_key(scored_assets, n=3, template=PROMPT_TEMPLATE_VERSION, ecosystem_summary=None):
+    """
+    Canonical, quantized description of what construct_gaia_prompt would show Gaia.
+    Cycles whose top-n assets fall into the same metric buckets share a key, even though
+    their raw prompts differ (timestamps, small price moves).
+    Returns a hex digest.
+    """
+    state = []
+    for asset, _ in scored_assets[:n]:
+        price = asset.get('current_price') or 0
+        change = asset.get('price_change_percentage_24h_in_currency') or 0
+        volume = asset.get('total_volume') or 0
+        high = asset.get('high_24h') or 0
+        low = asset.get('low_24h') or 0
+        state.append([
+            (asset.get('symbol') or '').upper(),
+            _bucket(change, PRICE_CHANGE_STEP),
+            _bucket(math.log10(volume), VOLUME_LOG_STEP) if volume > 0 else None,
+            _bucket((high - low) / price, VOLATILITY_STEP) if price else None,
+        ])
+    payload = json.dumps([template, ecosystem_summary, state], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
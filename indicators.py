@@ -0,0 +1,169 @@
+import math
+from collections import deque
+
+INDICATOR_WINDOW = 96  # Points in the rolling window (one day at 15-minute cycles)
+FAST_SPAN = 5
+SLOW_SPAN = 20
+TREND_THRESHOLD = 0.01  # EMA spread treated as a rising/falling trend
+VOLATILITY_THRESHOLD = 0.03  # Rolling stdev relative to the rolling mean treated as volatile
+VOLUME_Z_THRESHOLD = 1.0
+
+class RollingStats:
+    """
+    Mean and variance over the last `window` values (Welford's update with removal), O(1) per update.
+    """
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x):
+        if len(self.values) == self.values.maxlen:
+            self._remove(self.values[0])
+        self.values.append(x)
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+
+    def _remove(self, x):
+        if self.n <= 1:
+            self.n, self.mean, self._m2 = 0, 0.0, 0.0
+            return
+        old_mean = self.mean
+        self.n -= 1
+        self.mean = (old_mean * (self.n + 1) - x) / self.n
+        self._m2 = max(self._m2 - (x - old_mean) * (x - self.mean), 0.0)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def zscore(self, x):
+        std = self.std
+        return (x - self.mean) / std if std else 0.0
+
+class EMA:
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+
+    def update(self, x):
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+class RollingExtrema:
+    """
+    Rolling min and max over the last `window` values using monotonic deques, amortized O(1).
+    """
+    def __init__(self, window):
+        self.window = window
+        self._i = 0
+        self._min = deque()
+        self._max = deque()
+
+    def update(self, x):
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._min.append((self._i, x))
+        self._max.append((self._i, x))
+        expired = self._i - self.window
+        if self._min[0][0] <= expired:
+            self._min.popleft()
+        if self._max[0][0] <= expired:
+            self._max.popleft()
+        self._i += 1
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+class IndicatorState:
+    """
+    Streaming indicators for one symbol, updated in constant time per tick:
+    rolling price mean/stdev, fast and slow EMAs, rolling min/max, an ATR-style
+    volatility (EMA of absolute tick-to-tick moves), and a rolling volume z-score.
+    """
+    def __init__(self, window=INDICATOR_WINDOW):
+        self.price_stats = RollingStats(window)
+        self.volume_stats = RollingStats(window)
+        self.ema_fast = EMA(FAST_SPAN)
+        self.ema_slow = EMA(SLOW_SPAN)
+        self.extrema = RollingExtrema(window)
+        self.atr = EMA(SLOW_SPAN)
+        self.last_price = None
+        self.volume_z = 0.0
+
+    def update(self, price, volume):
+        if price is not None and not math.isnan(price):
+            self.price_stats.update(price)
+            self.ema_fast.update(price)
+            self.ema_slow.update(price)
+            self.extrema.update(price)
+            if self.last_price is not None:
+                self.atr.update(abs(price - self.last_price))
+            self.last_price = price
+        if volume is not None and not math.isnan(volume):
+            # Score the new volume against the window before it joins it
+            self.volume_z = self.volume_stats.zscore(volume) if self.volume_stats.n > 1 else 0.0
+            self.volume_stats.update(volume)
+
+    def price_trend(self):
+        stats = self.price_stats
+        if stats.n < 2:
+            return 'unknown'
+        if stats.n > 2 and stats.std > VOLATILITY_THRESHOLD * stats.mean:
+            return 'volatile'
+        slow = self.ema_slow.value
+        spread = (self.ema_fast.value - slow) / slow if slow else 0.0
+        if spread > TREND_THRESHOLD:
+            return 'rising'
+        if spread < -TREND_THRESHOLD:
+            return 'falling'
+        return 'flat'
+
+    def volume_trend(self):
+        if self.volume_stats.n < 2:
+            return 'unknown'
+        if self.volume_z > VOLUME_Z_THRESHOLD:
+            return 'surging'
+        if self.volume_z < -VOLUME_Z_THRESHOLD:
+            return 'dropping'
+        return 'steady'
+
+    def snapshot(self):
+        return {
+            'price_mean': self.price_stats.mean,
+            'price_std': self.price_stats.std,
+            'ema_fast': self.ema_fast.value,
+            'ema_slow': self.ema_slow.value,
+            'rolling_min': self.extrema.min,
+            'rolling_max': self.extrema.max,
+            'atr': self.atr.value,
+            'volume_z': self.volume_z,
+            'price_trend': self.price_trend(),
+            'volume_trend': self.volume_trend(),
+        }
+
+_states = {}
+
+def get_indicators(symbol, history=None):
+    """
+    Shared IndicatorState for a symbol. On first use it is warmed up from the
+    symbol's PriceHistory (if given), after which updates are incremental.
+    """
+    state = _states.get(symbol)
+    if state is None:
+        state = IndicatorState()
+        if history is not None:
+            for _, price, volume in history.view(INDICATOR_WINDOW).tolist():
+                state.update(price, volume)
+        _states[symbol] = state
+    return state
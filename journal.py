@@ -1,5 +1,207 @@
+import asyncio
+import gzip
 import json
+import os
+import shutil
+import threading
 from datetime import datetime
+from metrics import metrics
+from settings import load_config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JOURNAL_DIR = 'logs/journal'
+FSYNC_POLICIES = ('never', 'batch', 'always')
+
+def dumps(entry):
+    if orjson is not None:
+        return orjson.dumps(entry, default=str).decode()
+    return json.dumps(entry, default=str)
+
+def open_file(path):
+    """
+    Binary reader for a plain or compressed (.gz / .zst) journal file. Offsets are positions
+    in the uncompressed stream; compressed readers support seeking forward.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+def _compress_file(path):
+    """
+    Compress a closed journal file next to itself (.zst when zstandard is installed, else .gz)
+    and remove the original.
+    """
+    if zstandard is not None:
+        target = path + '.zst'
+        with open(path, 'rb') as src, open(target + '.tmp', 'wb') as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+    else:
+        target = path + '.gz'
+        with open(path, 'rb') as src, gzip.open(target + '.tmp', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+    os.replace(target + '.tmp', target)
+    os.remove(path)
+    return target
+
+class JournalWriter:
+    """
+    Buffered journal writer with daily files (<prefix>_<date>.jsonl).
+
+    write() only appends to an in-memory buffer. A background task started with start()
+    flushes the buffer in a worker thread once it holds `flush_size` entries or every
+    `flush_interval` seconds, keeping one file handle open per day. fsync policy:
+    'never' (leave it to the OS), 'batch' (once per flushed batch) or 'always' (every write
+    wakes the writer, and each entry is fsynced on its own). Batches are written one at a
+    time under a lock. When the day changes the previous file is closed and compressed.
+    Without a running background task, write() flushes synchronously.
+    """
+    def __init__(self, directory=JOURNAL_DIR, flush_size=64, flush_interval=1.0, fsync='batch', compress=True, prefix='journal'):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        self.directory = directory
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.compress = compress
+        self.prefix = prefix
+        self._buffer = []  # (date, line)
+        self._file = None
+        self._file_date = None
+        self._task = None
+        self._wakeup = None
+        self._closing = False
+        self._lock = threading.Lock()  # one batch (or close) touches the file at a time
+
+    def path_for(self, date):
+        return os.path.join(self.directory, f"{self.prefix}_{date}.jsonl")
+
+    def write(self, entry):
+        self._buffer.append((str(datetime.utcnow().date()), dumps(entry) + '\n'))
+        if self._task is None:
+            self.flush_sync()
+        elif self.fsync == 'always' or len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    def _write_batch(self, batch):
+        with self._lock, metrics.span('journal_write', prefix=self.prefix):
+            for date, line in batch:
+                if date != self._file_date:
+                    self._rotate(date)
+                self._file.write(line)
+                if self.fsync == 'always':
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+            if self._file is not None and self.fsync != 'always':
+                self._file.flush()
+                if self.fsync == 'batch':
+                    os.fsync(self._file.fileno())
+        metrics.inc('journal_entries_total', len(batch), prefix=self.prefix)
+
+    def _rotate(self, date):
+        previous = self._close_file()
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path_for(date), 'a')
+        self._file_date = date
+        if previous and self.compress:
+            _compress_file(previous)
+
+    def _close_file(self):
+        if self._file is None:
+            return None
+        path = self._file.name
+        self._file.close()
+        self._file = None
+        self._file_date = None
+        return path
+
+    def compress_closed_files(self):
+        """
+        Compress leftover .jsonl files from earlier days (e.g. after a crash or restart).
+        """
+        if not self.compress or not os.path.isdir(self.directory):
+            return
+        today = self.path_for(datetime.utcnow().date())
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(self.prefix + '_') and name.endswith('.jsonl') and path != today and path != getattr(self._file, 'name', None):
+                _compress_file(path)
+
+    def flush_sync(self):
+        batch, self._buffer = self._buffer, []
+        if batch:
+            self._write_batch(batch)
+
+    async def flush(self):
+        batch, self._buffer = self._buffer, []
+        if batch:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_batch, batch)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[WARN] Journal flush failed: {e}")
+
+    async def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._closing = False
+            await asyncio.get_running_loop().run_in_executor(None, self.compress_closed_files)
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            # Let the loop finish a batch already running in the executor; cancelling the task
+            # would not stop that thread, and the final flush would race it for the file
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        with self._lock:
+            self._close_file()
+
+def build_journal_writer(config):
+    options = config.get('journal') or {}
+    return JournalWriter(
+        directory=options.get('directory', JOURNAL_DIR),
+        flush_size=options.get('flush_size', 64),
+        flush_interval=options.get('flush_interval', 1.0),
+        fsync=options.get('fsync', 'batch'),
+        compress=options.get('compress', True),
+    )
+
+_journal_writer = None
+
+def get_journal_writer():
+    global _journal_writer
+    if _journal_writer is None:
+        _journal_writer = build_journal_writer(load_config())
+    return _journal_writer
+
+def __getattr__(name):
+    if name == 'journal_writer':
+        return get_journal_writer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def log_journal_entry(asset, decision, reasoning, amount=None, chart_snapshot=None, extra=None):
     """
@@ -15,5 +217,4 @@ def log_journal_entry(asset, decision, reasoning, amount=None, chart_snapshot=No
     }
     if extra:
         entry.update(extra)
-    with open("logs/journal.jsonl", "a") as f:
-        f.write(json.dumps(entry) + "\n") 
\ No newline at end of file
+    get_journal_writer().write(entry)
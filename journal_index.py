@@ -0,0 +1,260 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from journal import JOURNAL_DIR, open_file
+from learning_layer import DB_PATH
+
+INDEX_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS journal_files (
+        name TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        offset INTEGER NOT NULL DEFAULT 0,
+        complete INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS journal_entries (
+        file TEXT NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL,
+        timestamp TEXT,
+        asset TEXT,
+        action TEXT,
+        status TEXT,
+        outcome REAL,
+        PRIMARY KEY (file, offset)
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_journal_timestamp ON journal_entries (timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_journal_asset_timestamp ON journal_entries (asset, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_journal_action_timestamp ON journal_entries (action, timestamp)',
+]
+
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+
+def _logical_name(filename):
+    for suffix in COMPRESSED_SUFFIXES:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+# Indexed timestamps are fixed-width UTC strings, so text order is time order. Journal entries
+# mix minute precision ("...T13:05Z", agent.py) and microseconds (log_journal_entry), and in raw
+# form 'Z' sorts after ':', putting a minute-precision entry after the seconds of its minute.
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+TIMESTAMP_PATTERN = '____-__-__T__:__:__.______Z'
+
+def _timestamp(value):
+    """
+    A datetime or ISO string as TIMESTAMP_FORMAT (naive values are taken as UTC), or None.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime(TIMESTAMP_FORMAT)
+
+def _index_fields(entry):
+    """
+    (timestamp, asset, action, status, outcome) for one journal entry.
+    main.py entries carry a "Buy 75 LDO" decision and an execute_trade outcome dict;
+    log_journal_entry entries carry the bare action.
+    """
+    action = entry.get('action')
+    if action is None and isinstance(entry.get('decision'), str):
+        action = entry['decision'].split(' ', 1)[0] or None
+    outcome = entry.get('outcome')
+    status = None
+    if isinstance(outcome, dict):
+        status = outcome.get('status')
+        outcome = None
+    elif not isinstance(outcome, (int, float)):
+        outcome = None
+    return _timestamp(entry.get('timestamp')), entry.get('asset'), action, status, outcome
+
+class JournalIndex:
+    """
+    Sidecar index over the daily journal files, kept in the learning-layer SQLite database.
+
+    Each journal line is indexed by timestamp, asset, action and outcome along with its byte
+    offset, so queries read only the matching lines instead of re-parsing whole files.
+    refresh() is incremental: it resumes each file from the last indexed offset, and a day
+    that has since been compressed keeps its entries (offsets refer to the uncompressed data).
+    """
+    def __init__(self, db_path=DB_PATH, directory=JOURNAL_DIR):
+        self.db_path = db_path
+        self.directory = directory
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.create_function('journal_timestamp', 1, _timestamp)
+        with self.conn:
+            for statement in INDEX_SCHEMA:
+                self.conn.execute(statement)
+            # Rows indexed before timestamps were normalized still hold the raw entry string
+            self.conn.execute(
+                'UPDATE journal_entries SET timestamp = journal_timestamp(timestamp) '
+                'WHERE timestamp IS NOT NULL AND timestamp NOT LIKE ?',
+                (TIMESTAMP_PATTERN,),
+            )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _journal_files(self):
+        """
+        {logical name: current path}, preferring the plain file while a compressed copy is being written.
+        """
+        files = {}
+        if not os.path.isdir(self.directory):
+            return files
+        for filename in sorted(os.listdir(self.directory)):
+            name = _logical_name(filename)
+            if not (name.startswith('journal_') and name.endswith('.jsonl')):
+                continue
+            if name not in files or filename == name:
+                files[name] = os.path.join(self.directory, filename)
+        return files
+
+    def refresh(self):
+        """
+        Index any journal lines written since the last refresh. Returns the number of new entries.
+        """
+        added = 0
+        with self._lock:
+            known = {row[0]: row[1:] for row in self.conn.execute('SELECT name, path, offset, complete FROM journal_files')}
+            files = self._journal_files()
+            removed = [(name,) for name in known if name not in files]
+            if removed:
+                with self.conn:
+                    self.conn.executemany('DELETE FROM journal_entries WHERE file = ?', removed)
+                    self.conn.executemany('DELETE FROM journal_files WHERE name = ?', removed)
+            for name, path in files.items():
+                compressed = path.endswith(COMPRESSED_SUFFIXES)
+                indexed_path, offset, complete = known.get(name, (path, 0, 0))
+                if complete and indexed_path == path:
+                    continue
+                if not compressed:
+                    size = os.path.getsize(path)
+                    if size == offset and indexed_path == path:
+                        continue
+                    if size < offset:
+                        # Rewritten or truncated: start over
+                        with self.conn:
+                            self.conn.execute('DELETE FROM journal_entries WHERE file = ?', (name,))
+                        offset = 0
+                added += self._index_file(name, path, offset, compressed)
+        return added
+
+    def _index_file(self, name, path, offset, complete):
+        rows = []
+        with open_file(path) as f:
+            f.seek(offset)
+            while True:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    # End of file, or a line still being written
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if isinstance(entry, dict):
+                    rows.append((name, offset, len(line)) + _index_fields(entry))
+                offset += len(line)
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO journal_entries (file, offset, length, timestamp, asset, action, status, outcome) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO journal_files (name, path, offset, complete) VALUES (?, ?, ?, ?)',
+                (name, path, offset, int(complete)),
+            )
+        return len(rows)
+
+    @staticmethod
+    def _where(start, end, asset, action, status):
+        clauses, params = [], []
+        for clause, bound in (('timestamp >= ?', start), ('timestamp < ?', end)):
+            if bound is None:
+                continue
+            value = _timestamp(bound)
+            if value is None:
+                raise ValueError(f"Invalid timestamp bound: {bound!r}")
+            clauses.append(clause)
+            params.append(value)
+        for column, value in (('asset', asset), ('action', action), ('status', status)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def count(self, start=None, end=None, asset=None, action=None, status=None, refresh=True):
+        if refresh:
+            self.refresh()
+        where, params = self._where(start, end, asset, action, status)
+        with self._lock:
+            return self.conn.execute(f'SELECT COUNT(*) FROM journal_entries{where}', params).fetchone()[0]
+
+    def query(self, start=None, end=None, asset=None, action=None, status=None, limit=None, refresh=True):
+        """
+        Stream journal entries (dicts) matching the filters, oldest first.
+        `start` is inclusive and `end` exclusive; both take a datetime or ISO timestamp.
+        Only the matching lines are read from disk, one at a time.
+        """
+        if refresh:
+            self.refresh()
+        where, params = self._where(start, end, asset, action, status)
+        sql = f'SELECT file, offset, length FROM journal_entries{where} ORDER BY timestamp, file, offset'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            paths = dict(self.conn.execute('SELECT name, path FROM journal_files'))
+            locations = self.conn.execute(sql, params).fetchall()
+        handle, handle_name = None, None
+        try:
+            for name, offset, length in locations:
+                if name != handle_name or (paths[name].endswith(COMPRESSED_SUFFIXES) and handle.tell() > offset):
+                    # Compressed streams only seek forward cheaply: reopen to go back
+                    if handle is not None:
+                        handle.close()
+                    handle, handle_name = open_file(paths[name]), name
+                handle.seek(offset)
+                yield json.loads(handle.read(length))
+        finally:
+            if handle is not None:
+                handle.close()
+
+_index = None
+
+def get_index():
+    """
+    Process-wide JournalIndex, opened on first use.
+    """
+    global _index
+    if _index is None:
+        _index = JournalIndex(DB_PATH, JOURNAL_DIR)
+    return _index
+
+# Stream journal entries matching the filters
+def query_journal(start=None, end=None, asset=None, action=None, status=None, limit=None):
+    return get_index().query(start=start, end=end, asset=asset, action=action, status=status, limit=limit)
+
+# Count journal entries matching the filters
+def count_journal(start=None, end=None, asset=None, action=None, status=None):
+    return get_index().count(start=start, end=end, asset=asset, action=action, status=status)
@@ -1,64 +1,223 @@
+import os
 import sqlite3
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 
 DB_PATH = 'logs/learning_layer.db'
 
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS trades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        asset TEXT,
+        action TEXT,
+        amount REAL,
+        outcome REAL,
+        reasoning TEXT
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_trades_asset_timestamp ON trades (asset, timestamp)',
+    'CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp)',
+]
+
+# Running per-asset aggregates, kept current by triggers on every insert/update/delete
+STATS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS asset_stats (
+        asset TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        outcomes INTEGER NOT NULL DEFAULT 0,
+        return_sum REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trades_stats_insert AFTER INSERT ON trades BEGIN
+        INSERT INTO asset_stats (asset, count, wins, outcomes, return_sum)
+        VALUES (NEW.asset, 1, COALESCE(NEW.outcome > 0, 0), NEW.outcome IS NOT NULL, COALESCE(NEW.outcome, 0))
+        ON CONFLICT(asset) DO UPDATE SET
+            count = count + 1,
+            wins = wins + excluded.wins,
+            outcomes = outcomes + excluded.outcomes,
+            return_sum = return_sum + excluded.return_sum;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trades_stats_update AFTER UPDATE OF outcome ON trades BEGIN
+        UPDATE asset_stats SET
+            wins = wins - COALESCE(OLD.outcome > 0, 0) + COALESCE(NEW.outcome > 0, 0),
+            outcomes = outcomes - (OLD.outcome IS NOT NULL) + (NEW.outcome IS NOT NULL),
+            return_sum = return_sum - COALESCE(OLD.outcome, 0) + COALESCE(NEW.outcome, 0)
+        WHERE asset = NEW.asset;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trades_stats_delete AFTER DELETE ON trades BEGIN
+        UPDATE asset_stats SET
+            count = count - 1,
+            wins = wins - COALESCE(OLD.outcome > 0, 0),
+            outcomes = outcomes - (OLD.outcome IS NOT NULL),
+            return_sum = return_sum - COALESCE(OLD.outcome, 0)
+        WHERE asset = OLD.asset;
+    END
+    ''',
+]
+
+# The same aggregates computed from trade rows, for backfill and windowed queries
+AGGREGATE_COLUMNS = 'COUNT(*), COALESCE(SUM(outcome > 0), 0), COUNT(outcome), COALESCE(SUM(outcome), 0)'
+
+def _now():
+    return datetime.utcnow().isoformat(timespec='minutes') + 'Z'
+
+class TradeStore:
+    """
+    Long-lived SQLite store for trade history.
+    Holds one WAL-mode connection, creates the schema once, and serializes access with a lock.
+    """
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+            has_stats = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'asset_stats'"
+            ).fetchone()
+            for statement in STATS_SCHEMA:
+                self.conn.execute(statement)
+            if not has_stats:
+                # Existing databases: seed the aggregates from the trade history once
+                self.conn.execute(
+                    f'INSERT INTO asset_stats (asset, count, wins, outcomes, return_sum) '
+                    f'SELECT asset, {AGGREGATE_COLUMNS} FROM trades GROUP BY asset'
+                )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def record_trade(self, asset, action, amount, reasoning, outcome=None, timestamp=None):
+        with self._lock, self.conn:
+            cur = self.conn.execute('''
+                INSERT INTO trades (timestamp, asset, action, amount, outcome, reasoning)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (timestamp or _now(), asset, action, amount, outcome, reasoning))
+            return cur.lastrowid
+
+    def record_trades(self, trades):
+        """
+        Insert many trades in one transaction.
+        trades: iterable of dicts with asset, action, amount, reasoning and optional outcome, timestamp.
+        """
+        rows = [
+            (t.get('timestamp') or _now(), t['asset'], t['action'], t['amount'], t.get('outcome'), t['reasoning'])
+            for t in trades
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany('''
+                INSERT INTO trades (timestamp, asset, action, amount, outcome, reasoning)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+        return len(rows)
+
+    def update_outcome(self, trade_id, outcome):
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE trades SET outcome = ? WHERE id = ?', (outcome, trade_id))
+
+    def get_trades_for_asset(self, asset):
+        with self._lock:
+            return self.conn.execute('SELECT * FROM trades WHERE asset = ? ORDER BY timestamp DESC', (asset,)).fetchall()
+
+    @staticmethod
+    def _stats(row):
+        count, wins, outcomes, return_sum = row if row else (0, 0, 0, 0)
+        return {
+            'count': count,
+            'win_rate': wins / count if count else None,
+            'avg_return': return_sum / outcomes if outcomes else None,
+        }
+
+    def get_asset_stats(self, asset, last_n=None, since=None):
+        """
+        Win rate and average return for an asset.
+        Without a window this reads the running aggregates (one primary-key lookup).
+        `last_n` limits to the most recent N trades; `since` (a timedelta or ISO timestamp)
+        limits to trades at or after that time. Windowed queries aggregate in SQL over the
+        (asset, timestamp) index.
+        """
+        if last_n is None and since is None:
+            with self._lock:
+                row = self.conn.execute(
+                    'SELECT count, wins, outcomes, return_sum FROM asset_stats WHERE asset = ?', (asset,)
+                ).fetchone()
+            return self._stats(row)
+        if isinstance(since, timedelta):
+            since = (datetime.utcnow() - since).isoformat(timespec='minutes') + 'Z'
+        where, params = 'asset = ?', [asset]
+        if since is not None:
+            where += ' AND timestamp >= ?'
+            params.append(since)
+        limit = ''
+        if last_n is not None:
+            limit = ' LIMIT ?'
+            params.append(last_n)
+        with self._lock:
+            row = self.conn.execute(
+                f'SELECT {AGGREGATE_COLUMNS} FROM '
+                f'(SELECT outcome FROM trades WHERE {where} ORDER BY timestamp DESC{limit})',
+                params,
+            ).fetchone()
+        return self._stats(row)
+
+    def get_all_asset_stats(self):
+        """
+        Running aggregates for every asset, as {asset: stats}.
+        """
+        with self._lock:
+            rows = self.conn.execute('SELECT asset, count, wins, outcomes, return_sum FROM asset_stats').fetchall()
+        return {row[0]: self._stats(row[1:]) for row in rows}
+
+_store = None
+
+def get_store():
+    """
+    Process-wide TradeStore, opened on first use.
+    """
+    global _store
+    if _store is None:
+        _store = TradeStore(DB_PATH)
+    return _store
+
 # Initialize DB and table if not exists
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            asset TEXT,
-            action TEXT,
-            amount REAL,
-            outcome REAL,
-            reasoning TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    get_store()
 
 # Record a trade
 def record_trade(asset, action, amount, reasoning, outcome=None, timestamp=None):
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    ts = timestamp or datetime.utcnow().isoformat(timespec='minutes') + 'Z'
-    c.execute('''
-        INSERT INTO trades (timestamp, asset, action, amount, outcome, reasoning)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (ts, asset, action, amount, outcome, reasoning))
-    conn.commit()
-    conn.close()
+    return get_store().record_trade(asset, action, amount, reasoning, outcome=outcome, timestamp=timestamp)
+
+# Record many trades in one transaction
+def record_trades(trades):
+    return get_store().record_trades(trades)
 
 # Update outcome for a trade (by id)
 def update_outcome(trade_id, outcome):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('UPDATE trades SET outcome = ? WHERE id = ?', (outcome, trade_id))
-    conn.commit()
-    conn.close()
+    get_store().update_outcome(trade_id, outcome)
 
 # Query past trades for an asset
 def get_trades_for_asset(asset):
-    init_db()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT * FROM trades WHERE asset = ? ORDER BY timestamp DESC', (asset,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
-
-# Compute basic stats (win rate, avg return) for an asset
-def get_asset_stats(asset):
-    trades = get_trades_for_asset(asset)
-    n = len(trades)
-    if n == 0:
-        return {'count': 0, 'win_rate': None, 'avg_return': None}
-    wins = [t for t in trades if t[5] is not None and t[5] > 0]
-    avg_return = sum([t[5] for t in trades if t[5] is not None]) / len([t for t in trades if t[5] is not None])
-    win_rate = len(wins) / n
-    return {'count': n, 'win_rate': win_rate, 'avg_return': avg_return} 
\ No newline at end of file
+    return get_store().get_trades_for_asset(asset)
+
+# Compute basic stats (win rate, avg return) for an asset, optionally over a recent window
+def get_asset_stats(asset, last_n=None, since=None):
+    return get_store().get_asset_stats(asset, last_n=last_n, since=since)
+
+# Running stats for every asset
+def get_all_asset_stats():
+    return get_store().get_all_asset_stats()
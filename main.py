@@ -1,116 +1,147 @@
 import asyncio
-import yaml
-import os
-import json
 from datetime import datetime, timedelta
-from trade_counter import get_trade_counts, increment_trade, reset_trade_counts
-from trade_executor import execute_trade
-from charting import generate_chart_snapshot
-from gaia_client import gaia_client
-from recall_sandbox_client import RecallSandboxClient
-from coingecko_client import fetch_top_ethereum_assets, score_assets
-from gaia_prompt_utils import construct_gaia_prompt
-from learning_layer import record_trade, get_asset_stats
+from trade_counter import get_trade_limiter
+from charting import chart_service
+from agent import Agent
+from gaia_client import get_gaia_client
+from recall_sandbox_client import get_recall_client
+from portfolio_service import get_portfolio_service
+from cache import get_market_cache
+from coingecko_client import fetch_top_ethereum_assets
+from pipeline import PipelineScheduler
+from streaming import build_streaming_engine
+from journal import get_journal_writer
+from backtest import build_snapshot_recorder
+from metrics import metrics
+from settings import load_config
 
-with open('config.yaml') as f:
-    config = yaml.safe_load(f)
+config = load_config()
 
 MIN_TRADES_PER_DAY = config['scheduling'].get('trades_per_day', 3)
-PER_ASSET_MAX = config['trade_limits'].get('per_asset_daily', 2)
-OVERALL_MAX = config['trade_limits'].get('overall_daily', 5)
+SCORING = config.get('scoring') or {}
+SKIP_RULE = (config.get('learning') or {}).get('skip_rule')
+MARKET_UNIVERSE = config['scheduling'].get('market_universe', 50)
+METRICS = config.get('metrics') or {}
+# 'polling' runs a cycle every trade_interval_minutes; 'streaming' runs one when the price feed crosses a signal threshold
+MODE = config['scheduling'].get('mode', 'polling')
+snapshot_recorder = build_snapshot_recorder(config)
 
-recall_client = RecallSandboxClient({
-    'recall_api_url': config.get('recall_api_url', 'https://api.competitions.recall.network/api'),
-    'recall_api_key': config['api_keys']['recall']
-})
+_agent = None
 
-async def trade_cycle():
-    counts = get_trade_counts()
+def get_agent():
+    """
+    The single agent run by main(), built on first use from the shared clients.
+    """
+    global _agent
+    if _agent is None:
+        _agent = Agent(
+            None,
+            recall=get_recall_client(),
+            portfolio=get_portfolio_service(),
+            gaia=get_gaia_client(),
+            limiter=get_trade_limiter(),
+            journal=get_journal_writer(),
+            scoring=SCORING,
+            skip_rule=SKIP_RULE,
+            universe=MARKET_UNIVERSE,
+            min_trades_per_day=MIN_TRADES_PER_DAY,
+        )
+    return _agent
+
+def __getattr__(name):
+    if name == 'agent':
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def fetch_market(per_page=MARKET_UNIVERSE):
+    # 1. Fetch top Ethereum assets
+    with metrics.span('coingecko_fetch'):
+        assets = await fetch_top_ethereum_assets(per_page=per_page)
+    if snapshot_recorder is not None:
+        # Keep the raw market data so the cycle can be replayed by backtest.py
+        snapshot_recorder.record(assets)
+    return assets
+
+async def fetch_stage():
     # 1. Fetch and score top Ethereum assets
-    assets = await fetch_top_ethereum_assets()
-    scored = score_assets(assets)
-    # 2. Build Gaia prompt
-    prompt = construct_gaia_prompt(scored, n=3)
-    # 3. Gaia inference
-    gaia_decision = await gaia_client.gaia_infer_from_prompt(prompt)
-    asset_name = gaia_decision['asset']
-    action = gaia_decision['action']
-    amount = gaia_decision['amount']
-    reasoning = gaia_decision['reason']
-    # 4. Map Gaia asset to Recall token address
-    portfolio = await recall_client.get_portfolio()
-    symbol_map = {t['symbol'].upper(): t['token'] for t in portfolio.get('tokens', [])}
-    asset_symbol = None
-    # Try to match by symbol (case-insensitive)
-    for t in portfolio.get('tokens', []):
-        if asset_name and (asset_name.upper() == t['symbol'].upper() or asset_name.lower() in t['name'].lower()):
-            asset_symbol = t['symbol']
-            break
-    if not asset_symbol:
-        print(f"[WARN] Gaia asset '{asset_name}' not found in Recall portfolio. Skipping trade.")
-        return
-    # 4.5. Check learning layer stats
-    stats = get_asset_stats(asset_symbol)
-    if stats['count'] >= 5 and stats['win_rate'] is not None and stats['win_rate'] < 0.3:
-        print(f"[ADAPT] Skipping {asset_symbol} due to low win rate ({stats['win_rate']:.2f}) over {stats['count']} trades.")
-        return
-    # 5. Check trade limits
-    counts = get_trade_counts()  # reload in case of concurrent updates
-    asset_trades = counts['assets'].get(asset_symbol, 0)
-    if action in ('Buy', 'Sell'):
-        if counts['overall'] >= OVERALL_MAX:
-            print(f"[WARN] Overall daily trade limit ({OVERALL_MAX}) reached. Skipping trade.")
-            return
-        if asset_trades >= PER_ASSET_MAX:
-            print(f"[WARN] Per-asset daily trade limit ({PER_ASSET_MAX}) reached for {asset_symbol}. Skipping trade.")
-            return
-        # 6. Chart snapshot
-        history_path = os.path.join('logs/history', f"{asset_symbol}_history.json")
-        if os.path.exists(history_path):
-            with open(history_path, 'r') as f:
-                history = json.load(f)
-        else:
-            history = []
-        chart_snapshot = generate_chart_snapshot(asset_symbol, history)
-        # 7. Execute trade
-        outcome = execute_trade(asset_symbol, action, amount=amount)
-        increment_trade(asset_symbol)
-        # 8. Log journal entry
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(timespec='minutes') + 'Z',
-            "asset": asset_symbol,
-            "decision": f"{action} {amount} {asset_symbol}",
-            "reasoning": reasoning,
-            "chart_snapshot": chart_snapshot,
-            "outcome": outcome,
-            "learning_stats": stats
-        }
-        os.makedirs('logs/journal', exist_ok=True)
-        journal_path = os.path.join('logs/journal', f"journal_{datetime.utcnow().date()}.jsonl")
-        with open(journal_path, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
-        # 9. Record trade in learning layer
-        record_trade(asset_symbol, action, amount, reasoning, outcome=outcome)
-    else:
-        print(f"[INFO] Gaia decision: {action} for {asset_symbol}. No trade executed.")
+    agent = get_agent()
+    return agent.score(await fetch_market(agent.universe))
+
+async def decide_stage(scored):
+    return await get_agent().decide_stage(scored)
+
+async def execute_stage(decision):
+    return await get_agent().execute_stage(decision)
 
-async def daily_reset_loop():
+async def trade_cycle():
+    """
+    Run one full cycle sequentially: fetch, decide, execute.
+    """
+    agent = get_agent()
+    return await agent.cycle(await fetch_market(agent.universe))
+
+def _save_caches(_item=None):
+    # Persist the caches so a restart does not begin cold
+    get_market_cache().save()
+    get_agent().save_caches()
+
+async def daily_reset_loop(agents):
     while True:
         now = datetime.utcnow()
         next_midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
         wait_seconds = (next_midnight - now).total_seconds()
         await asyncio.sleep(wait_seconds)
-        counts = get_trade_counts()
-        if counts['overall'] < MIN_TRADES_PER_DAY:
-            print(f"[WARN] Only {counts['overall']} trades made today (minimum required: {MIN_TRADES_PER_DAY}).")
-        reset_trade_counts()
+        for each in agents:
+            each.daily_reset()
+
+def start_metrics():
+    """
+    Start the configured metrics endpoint and JSON dumper. Returns the dumper task, if any.
+    """
+    if not metrics.enabled:
+        return None
+    if METRICS.get('port'):
+        metrics.serve(METRICS['port'], METRICS.get('host', '127.0.0.1'))
+    if METRICS.get('dump_path'):
+        return asyncio.create_task(metrics.run_dumper(METRICS['dump_path'], METRICS.get('dump_interval', 60)))
+    return None
 
 async def main():
+    agent = get_agent()
     # Start daily reset loop in background
-    asyncio.create_task(daily_reset_loop())
-    while True:
-        await trade_cycle()
-        await asyncio.sleep(config['scheduling']['trade_interval_minutes'] * 60)
+    asyncio.create_task(daily_reset_loop([agent]))
+    flusher = asyncio.create_task(agent.limiter.run_flusher())
+    await agent.journal.start()
+    if snapshot_recorder is not None:
+        await snapshot_recorder.start()
+    metrics_dumper = start_metrics()
+    if MODE == 'streaming':
+        # Follow the scored universe unless streaming.symbols names the assets
+        universe = [a['symbol'].upper() for a in await fetch_market(agent.universe)]
+        scheduler = build_streaming_engine(config, trade_cycle, on_cycle_done=_save_caches, symbols=universe)
+    else:
+        scheduler = PipelineScheduler(
+            fetch_stage,
+            [('decide', decide_stage), ('execute', execute_stage)],
+            interval=config['scheduling']['trade_interval_minutes'] * 60,
+            on_cycle_done=_save_caches,
+        )
+    # One pooled Recall and Gaia connection for the lifetime of the agent
+    async with agent.recall, agent.gaia:
+        try:
+            await scheduler.run()
+        finally:
+            flusher.cancel()
+            if metrics_dumper is not None:
+                metrics_dumper.cancel()
+            metrics.close()
+            agent.limiter.flush()
+            await agent.journal.close()
+            if snapshot_recorder is not None:
+                await snapshot_recorder.close()
+            _save_caches()
+            chart_service.close()
+            print(f"[TIMING] Pipeline summary: {scheduler.report()}")
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
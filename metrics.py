@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from settings import load_config
+
+NAMESPACE = 'easel'
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'labels', 'started')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels, error='true') if exc_type is not None else self.labels
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **labels)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+class Metrics:
+    """
+    Counters and latency histograms for the trade cycle.
+
+    `with metrics.span('gaia_inference'):` times a block into the `<name>_seconds` histogram;
+    inc() bumps a counter and observe() records one histogram sample. Every call returns
+    immediately when disabled, and span() then hands back a shared no-op context manager.
+    Results are exposed as Prometheus text (render_prometheus / serve) or JSON (snapshot / dump).
+    """
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS, namespace=NAMESPACE):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}  # key -> [bucket counts..., sum, count]
+        self._server = None
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = _key(name + '_seconds', labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """
+        JSON-friendly view: counters by name and label string, histograms with count, sum,
+        mean and approximate p50/p99 (bucket upper bounds).
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+        result = {'timestamp': time.time(), 'counters': {}, 'histograms': {}}
+        for (name, labels), value in counters.items():
+            result['counters'].setdefault(name, {})[_format_labels(labels)] = value
+        for (name, labels), values in histograms.items():
+            count = values[-1]
+            result['histograms'].setdefault(name, {})[_format_labels(labels)] = {
+                'count': count,
+                'sum': values[-2],
+                'mean': values[-2] / count if count else None,
+                'p50': self._quantile(values, 0.5),
+                'p99': self._quantile(values, 0.99),
+            }
+        return result
+
+    def _quantile(self, values, q):
+        count = values[-1]
+        if not count:
+            return None
+        seen = 0
+        for bound, n in zip(self.buckets, values):
+            seen += n
+            if seen >= q * count:
+                return bound
+        return float('inf')
+
+    def render_prometheus(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            full = f'{self.namespace}_{name}'
+            if full not in typed:
+                typed.add(full)
+                lines.append(f'# TYPE {full} counter')
+            lines.append(f'{full}{_format_labels(labels)} {value}')
+        for (name, labels), values in histograms:
+            full = f'{self.namespace}_{name}'
+            if full not in typed:
+                typed.add(full)
+                lines.append(f'# TYPE {full} histogram')
+            cumulative = 0
+            for bound, n in zip(self.buckets, values):
+                cumulative += n
+                lines.append(f'{full}_bucket{_format_labels(labels, ("le", bound))} {cumulative}')
+            lines.append(f'{full}_bucket{_format_labels(labels, ("le", "+Inf"))} {values[-1]}')
+            lines.append(f'{full}_sum{_format_labels(labels)} {values[-2]}')
+            lines.append(f'{full}_count{_format_labels(labels)} {values[-1]}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """
+        Write snapshot() as JSON, atomically.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    async def run_dumper(self, path, interval=60.0):
+        """
+        Background task that dumps the metrics to `path` every `interval` seconds.
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                self.dump(path)
+        finally:
+            self.dump(path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        Serve Prometheus text at http://host:port/metrics (and JSON at /metrics.json) from a daemon thread.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.render_prometheus().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+metrics = Metrics(enabled=(load_config().get('metrics') or {}).get('enabled', False))
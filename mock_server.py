@@ -0,0 +1,258 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Route names used for per-route latency and error injection
+ROUTES = {
+    ('GET', '/coins/markets'): 'markets',
+    ('GET', '/api/price'): 'price',
+    ('GET', '/api/price/token-info'): 'token_info',
+    ('GET', '/api/trade/quote'): 'quote',
+    ('POST', '/api/trade/execute'): 'execute',
+    ('GET', '/api/agent/portfolio'): 'portfolio',
+    ('POST', '/v1/chat/completions'): 'chat',
+}
+
+def _per_route(value, route):
+    if isinstance(value, dict):
+        return value.get(route, value.get('default', 0.0))
+    return value
+
+class MockMarket:
+    """
+    Deterministic synthetic market of `assets` tokens (plus ETH) whose prices random-walk
+    a little on every CoinGecko markets request.
+    """
+    def __init__(self, assets=50, seed=0):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = [
+            {
+                'symbol': 'ETH' if i == 0 else f'TK{i}',
+                'name': 'Ethereum' if i == 0 else f'Token {i}',
+                'token': f'0x{i:040x}',
+                'price': 3000.0 if i == 0 else self.rng.uniform(0.1, 500.0),
+                'volume': self.rng.uniform(1e5, 1e9),
+            }
+            for i in range(assets + 1)
+        ]
+        self.by_address = {t['token']: t for t in self.tokens}
+        self.trades = 0
+
+    def markets(self, per_page):
+        with self.lock:
+            rows = []
+            for t in self.tokens[:per_page]:
+                change = self.rng.gauss(0, 3)
+                t['price'] *= 1 + change / 100
+                rows.append({
+                    'id': t['name'].lower().replace(' ', '-'),
+                    'symbol': t['symbol'].lower(),
+                    'name': t['name'],
+                    'current_price': t['price'],
+                    'total_volume': t['volume'] * self.rng.uniform(0.8, 1.2),
+                    'high_24h': t['price'] * (1 + abs(change) / 100),
+                    'low_24h': t['price'] * (1 - abs(change) / 100),
+                    'price_change_percentage_24h_in_currency': change,
+                })
+            return rows
+
+    def token(self, address):
+        return self.by_address.get(address) or self.tokens[0]
+
+    def portfolio(self):
+        tokens = [
+            {'token': t['token'], 'symbol': t['symbol'], 'name': t['name'], 'amount': 100.0,
+             'price': t['price'], 'value': 100.0 * t['price'], 'chain': 'evm', 'specificChain': 'eth'}
+            for t in self.tokens
+        ]
+        return {'success': True, 'agentId': 'mock-agent', 'totalValue': sum(t['value'] for t in tokens), 'tokens': tokens}
+
+    def decision(self):
+        with self.lock:
+            token = self.rng.choice(self.tokens[1:] or self.tokens)
+            action = self.rng.choice(['Buy', 'Buy', 'Sell', 'Hold'])
+        return {'asset': token['symbol'], 'action': action, 'amount': 1,
+                'reason': f"{token['name']} drifts like a slow brushstroke across the canvas."}
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, delayed ACKs add ~40ms per response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        route = ROUTES.get((method, url.path))
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length)) if length else {}
+        if route is None:
+            self._send_json(404, {'error': f'No mock for {method} {url.path}'})
+            return
+        server = self.server
+        server.record(route)
+        delay = _per_route(server.latency, route)
+        if delay:
+            time.sleep(delay * server.rng.uniform(1 - server.jitter, 1 + server.jitter))
+        if server.rng.random() < _per_route(server.error_rate, route):
+            server.record(route + '_error')
+            self._send_json(server.error_status, {'success': False, 'error': 'Injected error'})
+            return
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        getattr(self, f'_{route}')(params, payload)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _markets(self, params, payload):
+        self._send_json(200, self.server.market.markets(int(params.get('per_page', 50))))
+
+    def _price(self, params, payload):
+        token = self.server.market.token(params.get('token'))
+        self._send_json(200, {'success': True, 'token': token['token'], 'price': token['price'], 'chain': 'evm', 'specificChain': 'eth'})
+
+    def _token_info(self, params, payload):
+        token = self.server.market.token(params.get('token'))
+        self._send_json(200, {'success': True, 'token': token['token'], 'symbol': token['symbol'], 'name': token['name'],
+                              'price': token['price'], 'chain': 'evm', 'specificChain': 'eth'})
+
+    def _quote(self, params, payload):
+        market = self.server.market
+        source, target = market.token(params.get('fromToken')), market.token(params.get('toToken'))
+        amount = float(params.get('amount', 0))
+        self._send_json(200, {'fromToken': source['token'], 'toToken': target['token'], 'fromAmount': amount,
+                              'toAmount': amount * source['price'] / target['price'], 'exchangeRate': source['price'] / target['price']})
+
+    def _execute(self, params, payload):
+        market = self.server.market
+        source, target = market.token(payload.get('fromToken')), market.token(payload.get('toToken'))
+        amount = float(payload.get('amount', 0))
+        with market.lock:
+            market.trades += 1
+            trade_id = market.trades
+        self._send_json(200, {'success': True, 'transaction': {
+            'id': f'mock-{trade_id}', 'fromToken': source['token'], 'toToken': target['token'], 'fromAmount': amount,
+            'toAmount': amount * source['price'] / target['price'], 'price': source['price'] / target['price'],
+            'success': True, 'reason': payload.get('reason'), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }})
+
+    def _portfolio(self, params, payload):
+        self._send_json(200, self.server.market.portfolio())
+
+    def _chat(self, params, payload):
+        content = json.dumps(self.server.market.decision())
+        created = int(time.time())
+        model = payload.get('model', 'mock')
+        if not payload.get('stream'):
+            self._send_json(200, {
+                'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            })
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        step = max(1, len(content) // 8)
+        pieces = [content[i:i + step] for i in range(0, len(content), step)]
+        for i, piece in enumerate(pieces + [None]):
+            chunk = {
+                'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'delta': {'content': piece} if piece else {}, 'finish_reason': None if piece else 'stop'}],
+            }
+            self._write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode())
+        self._write_chunk(b'data: [DONE]\n\n')
+        self._write_chunk(b'')
+
+    def _write_chunk(self, data):
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+class MockServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Recall sandbox API (under /api), CoinGecko's /coins/markets and an
+    OpenAI-compatible /v1/chat/completions for Gaia.
+
+    latency: seconds added to every response (a float, or {route: seconds} with an optional 'default');
+    jitter: relative spread of that latency; error_rate: probability (float or per-route dict) of
+    answering with `error_status` instead. Routes: markets, price, token_info, quote, execute,
+    portfolio, chat. Use start()/stop() to run it on a background thread.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, assets=50, latency=0.0, jitter=0.2, error_rate=0.0, error_status=500, seed=0):
+        super().__init__((host, port), MockHandler)
+        self.market = MockMarket(assets, seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.requests = {}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def urls(self):
+        """
+        Base URLs for the agent's config: recall_api_url, coingecko_markets_url and gaia_url.
+        """
+        return {
+            'recall_api_url': f'{self.url}/api',
+            'coingecko_markets_url': f'{self.url}/coins/markets',
+            'gaia_url': f'{self.url}/v1',
+        }
+
+    def record(self, name):
+        with self._stats_lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local mock of the Recall, CoinGecko and Gaia APIs.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--assets', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    server = MockServer(args.host, args.port, assets=args.assets, latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    print(f"Mock server on {server.url}; point config.yaml at: {json.dumps(server.urls)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from metrics import metrics
+
+_DONE = object()
+
+class StageTimer:
+    """
+    Running latency statistics for one pipeline stage.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self.ema = None
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+        self.ema = seconds if self.ema is None else 0.7 * self.ema + 0.3 * seconds
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'avg': self.total / self.count if self.count else None,
+            'last': self.last,
+            'max': self.max,
+        }
+
+class PipelineScheduler:
+    """
+    Runs a trade cycle as a pipeline of stages connected by bounded asyncio queues.
+
+    `source` is a coroutine function producing the cycle's input (market data), and `stages` is
+    a list of (name, coroutine function) pairs. Each stage receives the previous stage's result
+    and may return None to end the cycle early.
+    Cycle N+1's source runs while cycle N is still in later stages. It is started ahead of each
+    cycle's deadline by its observed latency, so fresh data is ready when the deadline arrives.
+    Deadlines are anchored to the start time (start + n * interval) rather than sleeping a fixed
+    interval after each cycle, and deadlines that have already passed are skipped.
+    If later stages fall behind, the queued snapshot is replaced with the newer one.
+    """
+    def __init__(self, source, stages, interval, queue_size=1, lead_margin=1.0, source_name='fetch', on_cycle_done=None):
+        self.source = source
+        self.source_name = source_name
+        self.stages = list(stages)
+        self.interval = interval
+        self.queue_size = queue_size
+        self.lead_margin = lead_margin
+        self.on_cycle_done = on_cycle_done
+        self.timers = {source_name: StageTimer()}
+        self.timers.update({name: StageTimer() for name, _ in self.stages})
+        self.missed_deadlines = 0
+        self.dropped_snapshots = 0
+
+    async def run(self, cycles=None):
+        """
+        Run until cancelled, or for `cycles` cycles if given.
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        workers = [
+            asyncio.create_task(self._work(i, queues[i], queues[i + 1] if i + 1 < len(queues) else None))
+            for i in range(len(self.stages))
+        ]
+        try:
+            await self._produce(queues[0], cycles)
+            await queues[0].put(_DONE)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _produce(self, queue, cycles):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        n = 0
+        while cycles is None or n < cycles:
+            # Start early enough that the data is ready at the deadline
+            timer = self.timers[self.source_name]
+            lead = (timer.ema or 0.0) + self.lead_margin if timer.count else 0.0
+            delay = deadline - lead - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            item = {'cycle': n, 'deadline': deadline, 'timings': {}}
+            started = time.perf_counter()
+            try:
+                item['data'] = await self.source()
+            except Exception as e:
+                print(f"[WARN] Pipeline stage '{self.source_name}' failed in cycle {n}: {e}")
+                item = None
+            elapsed = time.perf_counter() - started
+            timer.record(elapsed)
+            metrics.observe('pipeline_stage', elapsed, stage=self.source_name)
+            if item is not None:
+                item['timings'][self.source_name] = elapsed
+                if queue.full():
+                    # Downstream is behind: the fresher snapshot replaces the queued one
+                    stale = queue.get_nowait()
+                    stale['superseded'] = True
+                    self.dropped_snapshots += 1
+                    metrics.inc('pipeline_dropped_snapshots_total')
+                    self._finish(stale)
+                queue.put_nowait(item)
+            n += 1
+            deadline += self.interval
+            now = loop.time()
+            if deadline < now:
+                skipped = int((now - deadline) // self.interval) + 1
+                self.missed_deadlines += skipped
+                metrics.inc('pipeline_missed_deadlines_total', skipped)
+                deadline += skipped * self.interval
+
+    async def _work(self, index, inbox, outbox):
+        name, stage = self.stages[index]
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                if outbox is not None:
+                    await outbox.put(_DONE)
+                return
+            if index == 0:
+                # Prefetched data waits for its cycle's deadline before acting on it
+                delay = item['deadline'] - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            started = time.perf_counter()
+            try:
+                result = await stage(item['data'])
+            except Exception as e:
+                print(f"[WARN] Pipeline stage '{name}' failed in cycle {item['cycle']}: {e}")
+                result = None
+            elapsed = time.perf_counter() - started
+            self.timers[name].record(elapsed)
+            metrics.observe('pipeline_stage', elapsed, stage=name)
+            item['timings'][name] = elapsed
+            if result is None or outbox is None:
+                self._finish(item)
+                continue
+            item['data'] = result
+            await outbox.put(item)
+
+    def _finish(self, item):
+        timings = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in item['timings'].items())
+        note = ' (superseded by newer data)' if item.get('superseded') else ''
+        print(f"[TIMING] Cycle {item['cycle']}: {timings}{note}")
+        if self.on_cycle_done is not None:
+            try:
+                self.on_cycle_done(item)
+            except Exception as e:
+                # A failing callback (e.g. saving caches) must not stop the stage worker
+                print(f"[WARN] Pipeline cycle callback failed in cycle {item['cycle']}: {e}")
+
+    def report(self):
+        """
+        Per-stage latency summary plus missed-deadline and dropped-snapshot counts.
+        """
+        return {
+            'stages': {name: timer.summary() for name, timer in self.timers.items()},
+            'missed_deadlines': self.missed_deadlines,
+            'dropped_snapshots': self.dropped_snapshots,
+        }
@@ -0,0 +1,90 @@
+import asyncio
+import difflib
+import time
+from recall_sandbox_client import get_recall_client
+from metrics import metrics
+from settings import load_config
+
+DEFAULT_PORTFOLIO_TTL = 60.0
+FUZZY_CUTOFF = 0.8
+
+class PortfolioService:
+    """
+    Cached Recall portfolio with lookup indexes, shared by trade_cycle and trade_executor.
+    The snapshot is refreshed after `ttl` seconds, or on the next access after invalidate()
+    (called once a trade has executed so balances are never stale).
+    """
+    def __init__(self, client, ttl=DEFAULT_PORTFOLIO_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._portfolio = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self.by_symbol = {}
+        self.by_name = {}
+        self._fuzzy_keys = {}
+
+    def invalidate(self):
+        self._portfolio = None
+
+    def _is_fresh(self):
+        return self._portfolio is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    def _index(self, portfolio):
+        tokens = portfolio.get('tokens', [])
+        self.by_symbol = {t['symbol'].upper(): t for t in tokens}
+        self.by_name = {t['name'].lower(): t for t in tokens if t.get('name')}
+        # Fuzzy candidates: lowercase symbols and names mapped back to their token
+        self._fuzzy_keys = {**{s.lower(): t for s, t in self.by_symbol.items()}, **self.by_name}
+
+    async def get(self, force=False):
+        """
+        Current portfolio, fetched at most once per TTL; concurrent callers share one refresh.
+        """
+        if not force and self._is_fresh():
+            return self._portfolio
+        async with self._lock:
+            if force or not self._is_fresh():
+                with metrics.span('portfolio_fetch'):
+                    portfolio = await self.client.get_portfolio()
+                self._index(portfolio)
+                self._portfolio = portfolio
+                self._fetched_at = time.monotonic()
+        return self._portfolio
+
+    async def resolve(self, asset_name):
+        """
+        Map a free-form asset name (e.g. from Gaia) to a portfolio token dict, or None.
+        Tries the exact symbol, then the exact name, then a name substring, then a fuzzy match.
+        """
+        if not asset_name:
+            return None
+        await self.get()
+        token = self.by_symbol.get(asset_name.upper()) or self.by_name.get(asset_name.lower())
+        if token:
+            return token
+        needle = asset_name.lower()
+        for name, token in self.by_name.items():
+            if needle in name:
+                return token
+        matches = difflib.get_close_matches(needle, self._fuzzy_keys, n=1, cutoff=FUZZY_CUTOFF)
+        return self._fuzzy_keys[matches[0]] if matches else None
+
+    async def address(self, symbol):
+        await self.get()
+        token = self.by_symbol.get(symbol.upper())
+        return token['token'] if token else None
+
+_portfolio_service = None
+
+def get_portfolio_service():
+    global _portfolio_service
+    if _portfolio_service is None:
+        ttl = load_config().get('portfolio_ttl_seconds', DEFAULT_PORTFOLIO_TTL)
+        _portfolio_service = PortfolioService(get_recall_client(), ttl=ttl)
+    return _portfolio_service
+
+def __getattr__(name):
+    if name == 'portfolio_service':
+        return get_portfolio_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,118 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+HISTORY_DIR = 'logs/history'
+HISTORY_CAPACITY = 4096  # Points retained per asset
+
+MAGIC = 0x45415345  # 'EASE'
+HEADER_FIELDS = 4  # magic, capacity, count, head
+HEADER_BYTES = HEADER_FIELDS * 8
+POINT_DTYPE = np.dtype([('timestamp', '<f8'), ('price', '<f8'), ('volume', '<f8')])
+
+def _to_epoch(timestamp):
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    # ISO strings as written by the agent, e.g. '2025-07-22T13:05:00.123456Z'
+    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def _to_iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+
+def _value(x):
+    return np.nan if x is None else float(x)
+
+class PriceHistory:
+    """
+    Fixed-size ring buffer of (timestamp, price, volume) points backed by a memory-mapped file.
+    Every point is written twice (at slot i and i + capacity), so the most recent `count` points
+    always form one contiguous slice and reads are zero-copy views into the map.
+    Appends are O(1) and never rewrite the file.
+    """
+    def __init__(self, path, capacity=HISTORY_CAPACITY):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_BYTES:
+            header = np.memmap(path, dtype='<i8', mode='r+', shape=(HEADER_FIELDS,))
+            if header[0] != MAGIC:
+                raise ValueError(f"{path} is not a price history file")
+            capacity = int(header[1])
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(np.array([MAGIC, capacity, 0, 0], dtype='<i8').tobytes())
+                f.truncate(HEADER_BYTES + 2 * capacity * POINT_DTYPE.itemsize)
+            header = np.memmap(path, dtype='<i8', mode='r+', shape=(HEADER_FIELDS,))
+        self.capacity = capacity
+        self._header = header
+        self._data = np.memmap(path, dtype=POINT_DTYPE, mode='r+', offset=HEADER_BYTES, shape=(2 * capacity,))
+
+    def __len__(self):
+        return int(self._header[2])
+
+    def append(self, price, volume, timestamp=None):
+        head = int(self._header[3])
+        point = (_to_epoch(timestamp), _value(price), _value(volume))
+        self._data[head] = point
+        self._data[head + self.capacity] = point
+        self._header[3] = (head + 1) % self.capacity
+        self._header[2] = min(len(self) + 1, self.capacity)
+
+    def extend(self, points):
+        for p in points:
+            self.append(p.get('price'), p.get('volume'), p.get('timestamp'))
+
+    def view(self, n=None):
+        """
+        The last n points (all retained points by default), oldest first, as a read-only structured view.
+        Columns are available as view['timestamp'], view['price'], view['volume'].
+        """
+        count = len(self)
+        n = count if n is None else min(n, count)
+        end = int(self._header[3]) + self.capacity
+        out = self._data[end - n:end]
+        out = out.view(np.ndarray)
+        out.flags.writeable = False
+        return out
+
+    def to_records(self, n=None):
+        """
+        The last n points as a list of {'timestamp', 'price', 'volume'} dicts, the format charting expects.
+        """
+        return [
+            {'timestamp': _to_iso(ts), 'price': None if np.isnan(p) else float(p), 'volume': None if np.isnan(v) else float(v)}
+            for ts, p, v in self.view(n).tolist()
+        ]
+
+    def flush(self):
+        self._header.flush()
+        self._data.flush()
+
+_histories = {}
+
+def _legacy_json_path(symbol, directory):
+    return os.path.join(directory, f"{symbol}_history.json")
+
+def get_history(symbol, directory=HISTORY_DIR, capacity=HISTORY_CAPACITY):
+    """
+    Shared PriceHistory for a symbol, opened once per process.
+    A new buffer is seeded from the old `{symbol}_history.json` file if one exists.
+    """
+    key = (directory, symbol)
+    history = _histories.get(key)
+    if history is None:
+        path = os.path.join(directory, f"{symbol}.ring")
+        is_new = not os.path.exists(path)
+        history = PriceHistory(path, capacity)
+        legacy_path = _legacy_json_path(symbol, directory)
+        if is_new and os.path.exists(legacy_path):
+            with open(legacy_path, 'r') as f:
+                history.extend(json.load(f))
+        _histories[key] = history
+    return history
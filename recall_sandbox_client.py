@@ -1,7 +1,18 @@
-import httpx
+from cache import get_market_cache
+from metrics import metrics
+from settings import load_config
+
+DEFAULT_HTTP_OPTIONS = {
+    'max_connections': 20,
+    'max_keepalive_connections': 10,
+    'keepalive_expiry': 30.0,
+    'http2': True,
+    'timeout': 10.0,
+    'connect_timeout': 5.0,
+}
 
 class RecallSandboxClient:
-    def __init__(self, config):
+    def __init__(self, config, http_client=None, cache=None):
         self.api_url = config.get('recall_api_url', 'https://api.sandbox.competitions.recall.network/api')
         self.api_key = config.get('recall_api_key', 'YOUR_RECALL_API_KEY')
         self.headers = {
@@ -9,6 +20,70 @@ class RecallSandboxClient:
             'Content-Type': 'application/json',
             'Accept': 'application/json',
         }
+        self.http_options = dict(DEFAULT_HTTP_OPTIONS)
+        self.http_options.update(config.get('http') or {})
+        # An injected client is shared with its owner and never closed here
+        self._client = http_client
+        self._owns_client = http_client is None
+        # Optional AsyncTTLCache for price/token-info lookups
+        self.cache = cache
+
+    def _build_client(self):
+        import httpx
+        opts = self.http_options
+        limits = httpx.Limits(
+            max_connections=opts['max_connections'],
+            max_keepalive_connections=opts['max_keepalive_connections'],
+            keepalive_expiry=opts['keepalive_expiry'],
+        )
+        timeout = httpx.Timeout(opts['timeout'], connect=opts['connect_timeout'])
+        http2 = bool(opts['http2'])
+        if http2:
+            try:
+                import h2  # noqa: F401  (httpx needs the h2 package for HTTP/2)
+            except ImportError:
+                http2 = False
+        return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+    @property
+    def client(self):
+        # Created lazily so the pool binds to the loop that first uses it
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+            self._owns_client = True
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and self._owns_client and not self._client.is_closed:
+            await self._client.aclose()
+        if self._owns_client:
+            self._client = None
+
+    async def __aenter__(self):
+        self.client
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def _get(self, path, params=None):
+        metrics.inc('api_requests_total', api='recall', endpoint=path)
+        with metrics.span('api_request', api='recall', endpoint=path):
+            resp = await self.client.get(f"{self.api_url}{path}", headers=self.headers, params=params)
+            resp.raise_for_status()
+        return resp.json()
+
+    async def _cached_get(self, endpoint, path, params):
+        if self.cache is None:
+            return await self._get(path, params)
+        return await self.cache.get_or_fetch(endpoint, [self.api_url, path, params], lambda: self._get(path, params))
+
+    async def _post(self, path, payload):
+        metrics.inc('api_requests_total', api='recall', endpoint=path)
+        with metrics.span('api_request', api='recall', endpoint=path):
+            resp = await self.client.post(f"{self.api_url}{path}", headers=self.headers, json=payload)
+            resp.raise_for_status()
+        return resp.json()
 
     async def get_token_price(self, token, chain=None, specific_chain=None):
         # GET /api/price
@@ -17,11 +92,7 @@ class RecallSandboxClient:
             params['chain'] = chain
         if specific_chain:
             params['specificChain'] = specific_chain
-        url = f"{self.api_url}/price"
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, headers=self.headers, params=params)
-            resp.raise_for_status()
-            return resp.json()
+        return await self._cached_get('recall_price', '/price', params)
 
     async def get_token_info(self, token, chain=None, specific_chain=None):
         # GET /api/price/token-info
@@ -30,11 +101,7 @@ class RecallSandboxClient:
             params['chain'] = chain
         if specific_chain:
             params['specificChain'] = specific_chain
-        url = f"{self.api_url}/price/token-info"
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, headers=self.headers, params=params)
-            resp.raise_for_status()
-            return resp.json()
+        return await self._cached_get('recall_token_info', '/price/token-info', params)
 
     async def get_trade_quote(self, from_token, to_token, amount, from_chain=None, from_specific_chain=None, to_chain=None, to_specific_chain=None):
         # GET /api/trade/quote
@@ -51,15 +118,10 @@ class RecallSandboxClient:
             params['toChain'] = to_chain
         if to_specific_chain:
             params['toSpecificChain'] = to_specific_chain
-        url = f"{self.api_url}/trade/quote"
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, headers=self.headers, params=params)
-            resp.raise_for_status()
-            return resp.json()
+        return await self._get('/trade/quote', params)
 
     async def execute_trade(self, from_token, to_token, amount, reason, slippage_tolerance, from_chain, from_specific_chain, to_chain, to_specific_chain):
         # POST /api/trade/execute
-        url = f"{self.api_url}/trade/execute"
         payload = {
             'fromToken': from_token,
             'toToken': to_token,
@@ -71,15 +133,35 @@ class RecallSandboxClient:
             'toChain': to_chain,
             'toSpecificChain': to_specific_chain
         }
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, headers=self.headers, json=payload)
-            resp.raise_for_status()
-            return resp.json()
+        return await self._post('/trade/execute', payload)
 
     async def get_portfolio(self):
         # GET /agent/portfolio
-        url = f"{self.api_url}/agent/portfolio"
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, headers=self.headers)
-            resp.raise_for_status()
-            return resp.json() 
\ No newline at end of file
+        return await self._get('/agent/portfolio')
+
+def build_recall_client(config, cache=None, http_client=None):
+    """
+    Build a RecallSandboxClient from the agent's config.yaml contents.
+    Pass `http_client` to share another client's connection pool.
+    """
+    api_url = config.get('recall_api_url') or config.get('api_keys', {}).get('recall_api_url')
+    return RecallSandboxClient({
+        'recall_api_url': api_url or 'https://api.sandbox.competitions.recall.network/api',
+        'recall_api_key': config['api_keys']['recall'],
+        'http': config.get('http'),
+    }, http_client=http_client, cache=cache)
+
+# Shared client: main, trade_executor and data_ingestion all use this one pool
+_recall_client = None
+
+def get_recall_client():
+    global _recall_client
+    if _recall_client is None:
+        _recall_client = build_recall_client(load_config(), cache=get_market_cache())
+    return _recall_client
+
+def __getattr__(name):
+    # `from recall_sandbox_client import recall_client` still works, and builds the client on first access
+    if name == 'recall_client':
+        return get_recall_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import main
+from agent import Agent
+from cache import get_market_cache
+from gaia_client import build_gaia_client, get_gaia_client
+from journal import build_journal_writer
+from learning_layer import TradeStore
+from metrics import metrics
+from pipeline import PipelineScheduler
+from portfolio_service import PortfolioService, DEFAULT_PORTFOLIO_TTL
+from recall_sandbox_client import build_recall_client, get_recall_client
+from settings import load_config
+from streaming import build_streaming_engine
+from trade_counter import build_trade_limiter
+
+AGENTS_DIR = 'logs/agents'
+
+def agent_config(config, overrides):
+    """
+    Config for one agent: each section in `overrides` is merged over the shared config's section.
+    """
+    merged = dict(config)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            merged[key] = {**config[key], **value}
+        else:
+            merged[key] = value
+    return merged
+
+class AgentRunner:
+    """
+    Runs several agents (config.yaml `agents:` list) in one process.
+
+    Every cycle fetches the CoinGecko market list once, through the shared market_cache, and
+    all agents score, decide and trade on it concurrently. Recall and Gaia requests go through
+    one pooled connection each, shared by all agents, and Gaia decisions share one cache.
+    API keys, portfolio, trade limits, learning store and journal stay per agent,
+    under logs/agents/<name>/.
+    """
+    def __init__(self, config, agent_configs=None, directory=AGENTS_DIR):
+        self.config = config
+        self.agent_configs = list(agent_configs or config.get('agents') or [{'name': 'default'}])
+        self.directory = directory
+        self.agents = []
+        self._gaia_pool = None
+        self._flushers = []
+
+    def _build_agent(self, overrides):
+        name = overrides['name']
+        directory = os.path.join(self.directory, name)
+        cfg = agent_config(self.config, overrides)
+        cfg['journal'] = {**(cfg.get('journal') or {}), 'directory': os.path.join(directory, 'journal')}
+        recall = build_recall_client(cfg, cache=get_market_cache(), http_client=get_recall_client().client)
+        scheduling = cfg.get('scheduling') or {}
+        return Agent(
+            name,
+            recall=recall,
+            portfolio=PortfolioService(recall, ttl=cfg.get('portfolio_ttl_seconds', DEFAULT_PORTFOLIO_TTL)),
+            gaia=build_gaia_client(cfg, http_client=self._gaia_pool, decision_cache=get_gaia_client().decision_cache),
+            limiter=build_trade_limiter(cfg, directory=directory),
+            journal=build_journal_writer(cfg),
+            store=TradeStore(os.path.join(directory, 'learning_layer.db')),
+            scoring=cfg.get('scoring'),
+            skip_rule=(cfg.get('learning') or {}).get('skip_rule'),
+            universe=scheduling.get('market_universe', 50),
+            min_trades_per_day=scheduling.get('trades_per_day', 3),
+        )
+
+    async def start(self):
+        # Pools are created inside the running loop
+        self._gaia_pool = get_gaia_client().build_http_client()
+        self.agents = [self._build_agent(overrides) for overrides in self.agent_configs]
+        for agent in self.agents:
+            await agent.journal.start()
+            self._flushers.append(asyncio.create_task(agent.limiter.run_flusher()))
+        if main.snapshot_recorder is not None:
+            await main.snapshot_recorder.start()
+        print(f"[INFO] Running {len(self.agents)} agents: {', '.join(a.name for a in self.agents)}")
+
+    async def fetch(self):
+        return await main.fetch_market(max(agent.universe for agent in self.agents))
+
+    async def _run_agent(self, agent, assets):
+        try:
+            return await agent.cycle(assets)
+        except Exception as e:
+            agent.log(f"[WARN] Cycle failed: {e}")
+            metrics.inc('agent_cycle_errors_total', agent=agent.name)
+            return None
+
+    async def cycle(self, assets):
+        """
+        Run every agent on one market list. Returns {agent name: journal entry or None}.
+        """
+        results = await asyncio.gather(*(self._run_agent(agent, assets) for agent in self.agents))
+        return {agent.name: result for agent, result in zip(self.agents, results)}
+
+    async def trade_cycle(self):
+        return await self.cycle(await self.fetch())
+
+    def save_caches(self, _item=None):
+        # The decision cache is shared (owned by the default Gaia client), so saving the market
+        # and Gaia caches once covers every agent
+        get_market_cache().save()
+        get_gaia_client().save_cache()
+
+    async def close(self):
+        for flusher in self._flushers:
+            flusher.cancel()
+        for agent in self.agents:
+            agent.limiter.flush()
+            await agent.journal.close()
+            await agent.recall.aclose()
+            await agent.gaia.aclose()
+            agent.store.close()
+        if self._gaia_pool is not None:
+            await self._gaia_pool.aclose()
+        if main.snapshot_recorder is not None:
+            await main.snapshot_recorder.close()
+        self.save_caches()
+
+    async def run(self, cycles=None):
+        """
+        Run on the configured schedule (scheduling.mode); `cycles` limits polling mode.
+        """
+        async with get_recall_client():
+            await self.start()
+            reset_loop = asyncio.create_task(main.daily_reset_loop(self.agents))
+            if self.config['scheduling'].get('mode', 'polling') == 'streaming':
+                universe = [a['symbol'].upper() for a in await self.fetch()]
+                scheduler = build_streaming_engine(self.config, self.trade_cycle, on_cycle_done=self.save_caches,
+                                                   symbols=universe)
+                run = scheduler.run()
+            else:
+                scheduler = PipelineScheduler(
+                    self.fetch,
+                    [('agents', self.cycle)],
+                    interval=self.config['scheduling']['trade_interval_minutes'] * 60,
+                    on_cycle_done=self.save_caches,
+                )
+                run = scheduler.run(cycles)
+            metrics_dumper = main.start_metrics()
+            try:
+                await run
+            finally:
+                reset_loop.cancel()
+                if metrics_dumper is not None:
+                    metrics_dumper.cancel()
+                metrics.close()
+                await self.close()
+                main.chart_service.close()
+                print(f"[TIMING] Pipeline summary: {scheduler.report()}")
+
+if __name__ == "__main__":
+    asyncio.run(AgentRunner(load_config()).run())
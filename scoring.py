@@ -0,0 +1,79 @@
+import numpy as np
+
+# Legacy heuristic: 2 * |price change| + volume / 1e6 + volatility
+DEFAULT_WEIGHTS = {'price_change': 2.0, 'volume': 1.0, 'volatility': 1.0}
+VOLUME_SCALE = 1e6
+NORMALIZATIONS = ('none', 'zscore', 'rank')
+
+def _column(assets, key):
+    # Missing and None values count as 0, matching the old `.get(key, 0) or 0`
+    return np.fromiter(((a.get(key) or 0) for a in assets), dtype=np.float64, count=len(assets))
+
+def build_columns(assets, price_change_key="price_change_percentage_24h_in_currency", volume_key="total_volume", high_key="high_24h", low_key="low_24h", price_key="current_price"):
+    """
+    Extract the scoring inputs from a list of CoinGecko market dicts into float64 column arrays.
+    """
+    return {
+        'price_change': _column(assets, price_change_key),
+        'volume': _column(assets, volume_key),
+        'high': _column(assets, high_key),
+        'low': _column(assets, low_key),
+        'price': _column(assets, price_key),
+    }
+
+def compute_terms(columns):
+    """
+    Compute the raw price-change, volume and volatility terms for every asset at once.
+    """
+    price = columns['price']
+    volatility = np.divide(columns['high'] - columns['low'], price, out=np.zeros_like(price), where=price != 0)
+    return {
+        'price_change': np.abs(columns['price_change']),
+        'volume': columns['volume'] / VOLUME_SCALE,
+        'volatility': volatility,
+    }
+
+def normalize(values, method='none'):
+    """
+    Cross-sectional normalization of one term across all assets.
+    'none' keeps raw values, 'zscore' standardizes, 'rank' maps to percentile ranks in [0, 1].
+    """
+    if method == 'none' or values.size == 0:
+        return values
+    if method == 'zscore':
+        std = values.std()
+        if std == 0:
+            return np.zeros_like(values)
+        return (values - values.mean()) / std
+    if method == 'rank':
+        if values.size == 1:
+            return np.zeros_like(values)
+        ranks = np.empty(values.size, dtype=np.float64)
+        ranks[np.argsort(values, kind='stable')] = np.arange(values.size)
+        return ranks / (values.size - 1)
+    raise ValueError(f"Unknown normalization '{method}', expected one of {NORMALIZATIONS}")
+
+def score_columns(columns, weights=None, normalization='none'):
+    """
+    Weighted sum of the normalized terms. Returns a float64 array of scores, one per asset.
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    terms = compute_terms(columns)
+    scores = np.zeros(len(columns['price']), dtype=np.float64)
+    for name, values in terms.items():
+        weight = weights.get(name, 0.0)
+        if weight:
+            scores += weight * normalize(values, normalization)
+    return scores
+
+def top_k_indices(scores, k=None):
+    """
+    Indices of the k highest scores in descending order. argpartition avoids sorting the whole universe.
+    """
+    n = scores.size
+    if k is None or k >= n:
+        return np.argsort(-scores, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
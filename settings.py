@@ -0,0 +1,16 @@
+import yaml
+
+CONFIG_PATH = 'config.yaml'
+
+_configs = {}
+
+def load_config(path=CONFIG_PATH):
+    """
+    Parsed config.yaml, read once per process and shared by every module.
+    Treat the result as read-only; copy a section before changing it.
+    """
+    config = _configs.get(path)
+    if config is None:
+        with open(path) as f:
+            config = _configs[path] = yaml.safe_load(f) or {}
+    return config
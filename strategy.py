@@ -0,0 +1,49 @@
+from gaia_prompt_utils import construct_gaia_prompt, market_state_key
+from metrics import metrics
+
+# Learning-layer skip rule: avoid assets with at least this many trades and a win rate below the threshold
+SKIP_MIN_TRADES = 5
+SKIP_MAX_WIN_RATE = 0.3
+PROMPT_ASSETS = 3
+
+def should_skip(stats, min_trades=SKIP_MIN_TRADES, max_win_rate=SKIP_MAX_WIN_RATE):
+    return stats['count'] >= min_trades and stats['win_rate'] is not None and stats['win_rate'] < max_win_rate
+
+async def decide(scored, infer, resolve, get_stats, skip_rule=None, n=PROMPT_ASSETS):
+    """
+    The decision path shared by the live agent and the backtester.
+
+    infer: async (prompt, scored, cache_key) -> {asset, action, amount, reason}, e.g. Gaia.
+    resolve: async asset name -> portfolio token dict or None.
+    get_stats: asset symbol -> learning-layer stats dict.
+    skip_rule: optional {'min_trades', 'max_win_rate'} overriding the defaults.
+    Returns (decision, note): decision is {asset, action, amount, reasoning, stats} when there is
+    a trade to make, otherwise None and `note` says why.
+    """
+    with metrics.span('prompt_build'):
+        prompt = construct_gaia_prompt(scored, n=n)
+        cache_key = market_state_key(scored, n=n)
+    with metrics.span('gaia_inference'):
+        gaia_decision = await infer(prompt, scored, cache_key)
+    asset_name = gaia_decision['asset']
+    action = gaia_decision['action']
+    token = await resolve(asset_name)
+    if not token:
+        metrics.inc('trades_skipped_total', reason='unresolved_asset')
+        return None, f"[WARN] Gaia asset '{asset_name}' not found in Recall portfolio. Skipping trade."
+    asset_symbol = token['symbol']
+    stats = get_stats(asset_symbol)
+    if should_skip(stats, **(skip_rule or {})):
+        metrics.inc('trades_skipped_total', reason='low_win_rate')
+        return None, f"[ADAPT] Skipping {asset_symbol} due to low win rate ({stats['win_rate']:.2f}) over {stats['count']} trades."
+    if action not in ('Buy', 'Sell'):
+        metrics.inc('trades_skipped_total', reason='no_action')
+        return None, f"[INFO] Gaia decision: {action} for {asset_symbol}. No trade executed."
+    decision = {
+        'asset': asset_symbol,
+        'action': action,
+        'amount': gaia_decision['amount'],
+        'reasoning': gaia_decision['reason'],
+        'stats': stats,
+    }
+    return decision, None
@@ -0,0 +1,353 @@
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from backtest import SNAPSHOT_DIR, load_snapshots
+from indicators import get_indicators
+from metrics import metrics
+from pipeline import StageTimer
+from price_history import HISTORY_DIR, _to_epoch, get_history
+from settings import load_config
+
+# Signal thresholds (streaming.signals in config.yaml)
+PRICE_MOVE_PCT = 1.0  # move since the symbol's last signal, in percent
+VOLUME_Z = 2.0  # rolling volume z-score of a single tick
+COOLDOWN_SECONDS = 60.0  # minimum feed time between triggered cycles
+
+# Message keys of the feed (streaming.fields in config.yaml). The defaults match the Binance
+# <symbol>@ticker stream: 's' symbol, 'c' last price, 'E' event time in ms. Its volumes ('v', 'q')
+# are running 24h totals, which would make the volume z-score meaningless, so volume is unset.
+DEFAULT_FIELDS = {
+    'symbol': 's',
+    'price': 'c',
+    'timestamp': 'E',
+    'volume': None,  # key of a per-tick volume, if the feed has one
+    'symbol_suffix': 'USDT',  # stripped from feed symbols, e.g. ETHUSDT -> ETH
+}
+
+def parse_ticks(message, symbols=None, fields=None):
+    """
+    Ticks ({symbol, price, volume, timestamp}) from one feed message: a JSON object, a list of
+    them, or either wrapped in {'data': ...}. `fields` maps tick fields to message keys (see
+    DEFAULT_FIELDS). Millisecond timestamps are converted to seconds.
+    `symbols` (upper case) drops ticks for other assets.
+    """
+    fields = {**DEFAULT_FIELDS, **(fields or {})}
+    suffix = (fields.get('symbol_suffix') or '').upper()
+    if isinstance(message, (str, bytes)):
+        message = json.loads(message)
+    if isinstance(message, dict) and 'data' in message:
+        message = message['data']
+    ticks = []
+    for item in message if isinstance(message, list) else [message]:
+        if not isinstance(item, dict):
+            continue
+        symbol, price = item.get(fields['symbol']), item.get(fields['price'])
+        if symbol is None or price is None:
+            continue
+        symbol = str(symbol).upper()
+        if suffix and symbol.endswith(suffix) and symbol != suffix:
+            symbol = symbol[:-len(suffix)]
+        if symbols and symbol not in symbols:
+            continue
+        timestamp = item.get(fields['timestamp']) if fields.get('timestamp') else None
+        if isinstance(timestamp, (int, float)) and timestamp > 1e11:
+            timestamp = timestamp / 1000
+        volume = item.get(fields['volume']) if fields.get('volume') else None
+        ticks.append({
+            'symbol': symbol,
+            'price': float(price),
+            'volume': float(volume) if volume is not None else None,
+            'timestamp': _to_epoch(timestamp),
+        })
+    return ticks
+
+class WebSocketPriceFeed:
+    """
+    Ticks from a websocket price feed, parsed with `fields` (see parse_ticks). `subscribe`
+    (a JSON-serializable message) is sent after every connect; the connection is re-opened
+    with exponential backoff when it drops.
+    """
+    def __init__(self, url, symbols=None, subscribe=None, fields=None, reconnect_delay=1.0, max_reconnect_delay=60.0):
+        self.url = url
+        self.symbols = {s.upper() for s in symbols} if symbols else None
+        self.subscribe = subscribe
+        self.fields = fields
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+    async def ticks(self):
+        import websockets
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    if self.subscribe:
+                        await ws.send(json.dumps(self.subscribe))
+                    print(f"[INFO] Connected to price feed {self.url}")
+                    delay = self.reconnect_delay
+                    async for message in ws:
+                        try:
+                            ticks = parse_ticks(message, self.symbols, self.fields)
+                        except ValueError as e:
+                            print(f"[WARN] Ignoring unparseable feed message: {e}")
+                            continue
+                        for tick in ticks:
+                            yield tick
+                reason = 'closed by server'
+            except (OSError, websockets.WebSocketException) as e:
+                reason = str(e)
+            metrics.inc('stream_reconnects_total')
+            print(f"[WARN] Price feed disconnected ({reason}); reconnecting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+class ReplaySource:
+    """
+    Ticks replayed from recorded market snapshots (backtest.SnapshotRecorder files), one per
+    asset per snapshot. `speed` is a multiple of real time; 0 replays as fast as possible.
+    """
+    def __init__(self, path=SNAPSHOT_DIR, speed=0.0, symbols=None):
+        self.path = path
+        self.speed = speed
+        self.symbols = {s.upper() for s in symbols} if symbols else None
+
+    async def ticks(self):
+        previous = None
+        for snapshot in load_snapshots(self.path):
+            timestamp = _to_epoch(snapshot['timestamp'])
+            delay = (timestamp - previous) / self.speed if self.speed and previous is not None else 0
+            await asyncio.sleep(max(delay, 0))
+            previous = timestamp
+            for asset in snapshot['markets']:
+                symbol = (asset.get('symbol') or '').upper()
+                if not symbol or asset.get('current_price') is None or (self.symbols and symbol not in self.symbols):
+                    continue
+                # CoinGecko's total_volume is a running 24h total, not the volume of this tick
+                yield {'symbol': symbol, 'price': float(asset['current_price']), 'volume': None, 'timestamp': timestamp}
+
+class SignalDetector:
+    """
+    Per-symbol trade signals from streaming indicator state:
+    - price_move: price moved `price_move_pct` percent from the symbol's last signal (or first tick)
+    - volume_spike: the tick's rolling volume z-score reached `volume_z`
+    - trend_change: the EMA trend flipped between rising and falling
+    A threshold set to None disables that signal.
+    """
+    def __init__(self, price_move_pct=PRICE_MOVE_PCT, volume_z=VOLUME_Z, trend_change=True):
+        self.price_move_pct = price_move_pct
+        self.volume_z = volume_z
+        self.trend_change = trend_change
+        self._reference = {}  # symbol -> price at the last signal
+        self._trend = {}  # symbol -> last rising/falling trend
+
+    def check(self, symbol, price, indicators):
+        """
+        Returns (reason, value) for the first threshold crossed by this tick, or None.
+        """
+        # The trend is tracked on every tick, so a flip is measured against the latest trend
+        # even when an earlier threshold decided the previous tick
+        flipped = None
+        if self.trend_change:
+            trend = indicators.price_trend()
+            if trend in ('rising', 'falling'):
+                previous = self._trend.get(symbol)
+                self._trend[symbol] = trend
+                if previous is not None and previous != trend:
+                    flipped = trend
+        reference = self._reference.setdefault(symbol, price)
+        if self.price_move_pct is not None and reference:
+            move = (price - reference) / reference * 100
+            if abs(move) >= self.price_move_pct:
+                return 'price_move', move
+        if self.volume_z is not None and indicators.volume_z >= self.volume_z:
+            return 'volume_spike', indicators.volume_z
+        if flipped is not None:
+            return 'trend_change', flipped
+        return None
+
+    def acknowledge(self, symbol, price):
+        # Moves are measured from the price at which the last signal was acted on
+        self._reference[symbol] = price
+
+class StreamingEngine:
+    """
+    Event-driven alternative to PipelineScheduler: consumes a tick source, appends every tick to
+    the symbol's PriceHistory and IndicatorState, and runs `cycle` (e.g. main.trade_cycle) when
+    a SignalDetector threshold is crossed instead of on a fixed interval.
+
+    At most one cycle runs at a time; signals arriving meanwhile are coalesced into one follow-up
+    cycle. `cooldown` is measured in feed time, so replays behave like the live feed.
+    When nothing has triggered for `fallback_interval` seconds (wall time), a cycle runs anyway.
+    Ticks for symbols outside `symbols` (upper case) are dropped before any history is created.
+    """
+    def __init__(self, source, cycle, symbols, detector=None, cooldown=COOLDOWN_SECONDS, fallback_interval=None,
+                 on_cycle_done=None, history_dir=HISTORY_DIR):
+        self.source = source
+        self.symbols = {s.upper() for s in symbols}
+        self.cycle = cycle
+        self.detector = detector or SignalDetector()
+        self.cooldown = cooldown
+        self.fallback_interval = fallback_interval
+        self.on_cycle_done = on_cycle_done
+        self.history_dir = history_dir
+        self.timer = StageTimer()
+        self.ticks = 0
+        self.signals = {}
+        self.suppressed = 0
+        self.coalesced = 0
+        self._last_signal_at = None  # feed time
+        self._last_cycle_started = time.monotonic()
+        self._task = None
+        self._pending = None
+
+    def handle_tick(self, tick):
+        """
+        Update history and indicators with one tick; returns the signal it triggered, if any.
+        """
+        symbol, price, volume = tick['symbol'], tick['price'], tick.get('volume')
+        if symbol not in self.symbols:
+            return None
+        self.ticks += 1
+        metrics.inc('stream_ticks_total')
+        history = get_history(symbol, self.history_dir)
+        # Created (and warmed up from the history) before this tick is appended
+        indicators = get_indicators(symbol, history)
+        history.append(price, volume, tick['timestamp'])
+        indicators.update(price, volume)
+        found = self.detector.check(symbol, price, indicators)
+        if found is None:
+            return None
+        reason, value = found
+        if self._last_signal_at is not None and tick['timestamp'] - self._last_signal_at < self.cooldown:
+            self.suppressed += 1
+            return None
+        self._last_signal_at = tick['timestamp']
+        self.detector.acknowledge(symbol, price)
+        signal = {'symbol': symbol, 'reason': reason, 'value': value, 'timestamp': tick['timestamp'], 'received': time.monotonic()}
+        self.signals[reason] = self.signals.get(reason, 0) + 1
+        metrics.inc('stream_signals_total', reason=reason)
+        self._trigger(signal)
+        return signal
+
+    def _trigger(self, signal):
+        if self._task is not None and not self._task.done():
+            # Folded into the one follow-up cycle, which starts with the latest signal
+            self.coalesced += 1
+            self._pending = signal
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run_cycles(signal))
+
+    async def _run_cycles(self, signal):
+        while signal is not None:
+            self._last_cycle_started = time.monotonic()
+            metrics.observe('stream_signal_latency', self._last_cycle_started - signal['received'])
+            metrics.inc('stream_cycles_total', trigger=signal['reason'])
+            result = None
+            try:
+                with metrics.span('stream_cycle'):
+                    result = await self.cycle()
+            except Exception as e:
+                print(f"[WARN] Triggered cycle failed: {e}")
+            elapsed = time.monotonic() - self._last_cycle_started
+            self.timer.record(elapsed)
+            value = signal['value']
+            detail = f"{value:+.2f}" if isinstance(value, float) else value
+            print(f"[TIMING] Cycle {self.timer.count - 1} ({signal['reason']} {signal['symbol']} {detail}): {elapsed:.2f}s")
+            if self.on_cycle_done is not None:
+                self.on_cycle_done(result)
+            signal, self._pending = self._pending, None
+
+    async def _fallback_loop(self):
+        # Keeps the minimum trade cadence when the market is quiet
+        while True:
+            await asyncio.sleep(max(self.fallback_interval - (time.monotonic() - self._last_cycle_started), 1.0))
+            if time.monotonic() - self._last_cycle_started >= self.fallback_interval:
+                self._trigger({'symbol': '-', 'reason': 'fallback', 'value': None, 'timestamp': time.time(), 'received': time.monotonic()})
+
+    async def run(self, max_ticks=None):
+        """
+        Consume the source until it ends (or `max_ticks`), then wait for the running cycle.
+        """
+        fallback = asyncio.create_task(self._fallback_loop()) if self.fallback_interval else None
+        try:
+            async for tick in self.source.ticks():
+                self.handle_tick(tick)
+                if max_ticks is not None and self.ticks >= max_ticks:
+                    break
+            while self._task is not None and not self._task.done():
+                await self._task
+        finally:
+            if fallback is not None:
+                fallback.cancel()
+
+    def report(self):
+        return {
+            'stages': {'cycle': self.timer.summary()},
+            'ticks': self.ticks,
+            'signals': dict(self.signals),
+            'suppressed': self.suppressed,
+            'coalesced': self.coalesced,
+        }
+
+def build_price_source(config, symbols=None):
+    options = config.get('streaming') or {}
+    symbols = options.get('symbols') or symbols
+    if options.get('source', 'websocket') == 'replay':
+        return ReplaySource(options.get('replay_path', SNAPSHOT_DIR), speed=options.get('replay_speed', 0.0), symbols=symbols)
+    if not options.get('url'):
+        raise ValueError("streaming.url is required for the websocket price source")
+    return WebSocketPriceFeed(options['url'], symbols=symbols, subscribe=options.get('subscribe'), fields=options.get('fields'))
+
+def build_streaming_engine(config, cycle, on_cycle_done=None, source=None, history_dir=HISTORY_DIR, symbols=None):
+    """
+    StreamingEngine from the `streaming` section of config.yaml.
+    streaming.symbols defaults to `symbols` (the scored universe); one of them must be set, since
+    every symbol that is kept gets its own history file.
+    The fallback interval defaults to scheduling.trade_interval_minutes.
+    """
+    options = config.get('streaming') or {}
+    symbols = options.get('symbols') or symbols
+    if not symbols:
+        raise ValueError("streaming.symbols is empty and no universe was given")
+    signals = options.get('signals') or {}
+    fallback_minutes = options.get('fallback_minutes', config['scheduling']['trade_interval_minutes'])
+    return StreamingEngine(
+        source or build_price_source(config, symbols),
+        cycle,
+        symbols,
+        detector=SignalDetector(
+            price_move_pct=signals.get('price_move_pct', PRICE_MOVE_PCT),
+            volume_z=signals.get('volume_z', VOLUME_Z),
+            trend_change=signals.get('trend_change', True),
+        ),
+        cooldown=options.get('cooldown_seconds', COOLDOWN_SECONDS),
+        fallback_interval=fallback_minutes * 60 if fallback_minutes else None,
+        on_cycle_done=on_cycle_done,
+        history_dir=history_dir,
+    )
+
+if __name__ == "__main__":
+    config = load_config()
+    parser = argparse.ArgumentParser(description='Replay snapshots through the streaming signal thresholds without trading.')
+    parser.add_argument('path', nargs='?', default=(config.get('backtest') or {}).get('snapshot_dir', SNAPSHOT_DIR))
+    parser.add_argument('--speed', type=float, default=0.0, help='multiple of real time; 0 replays as fast as possible')
+    args = parser.parse_args()
+
+    async def _no_trade():
+        return None
+
+    async def _replay():
+        # Replayed ticks go to a scratch history so the live buffers are untouched
+        # Without streaming.symbols, replay the universe of the first snapshot
+        first = next(iter(load_snapshots(args.path)), None)
+        universe = [a['symbol'].upper() for a in first['markets'] if a.get('symbol')] if first else None
+        with tempfile.TemporaryDirectory(prefix='stream_') as history_dir:
+            engine = build_streaming_engine(config, _no_trade, source=ReplaySource(args.path, speed=args.speed),
+                                            history_dir=history_dir, symbols=universe)
+            engine.fallback_interval = None
+            await engine.run()
+            print(json.dumps(engine.report(), indent=2))
+
+    asyncio.run(_replay())
@@ -0,0 +1,201 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+from backtest import load_snapshots, run_backtest
+from settings import load_config
+
+SWEEP_DIR = 'logs/sweeps'
+# Per-asset columns kept for every snapshot; NaN marks an asset absent from that snapshot
+FIELDS = (
+    'position',
+    'current_price',
+    'price_change_percentage_24h_in_currency',
+    'total_volume',
+    'high_24h',
+    'low_24h',
+    'recall_price',
+)
+WEIGHT_PARAMS = ('price_change', 'volume', 'volatility')
+SKIP_PARAMS = ('min_trades', 'max_win_rate')
+
+class SweepDataset:
+    """
+    Recorded snapshots packed into one float64 array of shape (cycles, assets, fields),
+    saved as .npy so worker processes memory-map it read-only instead of receiving a pickled copy.
+    """
+    def __init__(self, path, timestamps, symbols, names):
+        self.path = path
+        self.timestamps = timestamps
+        self.symbols = symbols
+        self.names = names
+
+    @classmethod
+    def build(cls, snapshots, path):
+        snapshots = list(snapshots)
+        symbols, names, index = [], [], {}
+        for snapshot in snapshots:
+            for asset in snapshot['markets']:
+                symbol = asset.get('symbol')
+                if symbol and symbol not in index:
+                    index[symbol] = len(symbols)
+                    symbols.append(symbol)
+                    names.append(asset.get('name'))
+        data = np.full((len(snapshots), len(symbols), len(FIELDS)), np.nan)
+        for c, snapshot in enumerate(snapshots):
+            prices = {k.upper(): v for k, v in (snapshot.get('prices') or {}).items()}
+            for position, asset in enumerate(snapshot['markets']):
+                symbol = asset.get('symbol')
+                if not symbol:
+                    continue
+                row = data[c, index[symbol]]
+                row[0] = position
+                for f, field in enumerate(FIELDS[1:-1], start=1):
+                    value = asset.get(field)
+                    if value is not None:
+                        row[f] = value
+                if prices.get(symbol.upper()) is not None:
+                    row[-1] = prices[symbol.upper()]
+        np.save(path, data)
+        return cls(path, [s['timestamp'] for s in snapshots], symbols, names)
+
+    def meta(self):
+        return {'path': self.path, 'timestamps': self.timestamps, 'symbols': self.symbols, 'names': self.names}
+
+def iter_snapshots(data, timestamps, symbols, names):
+    """
+    Rebuild snapshot dicts (as recorded by SnapshotRecorder) one cycle at a time from the packed array.
+    """
+    for c, timestamp in enumerate(timestamps):
+        cycle = data[c]
+        present = np.flatnonzero(~np.isnan(cycle[:, 0]))
+        present = present[np.argsort(cycle[present, 0], kind='stable')]
+        markets, prices = [], {}
+        for a in present:
+            row = cycle[a]
+            asset = {'symbol': symbols[a], 'name': names[a], 'id': symbols[a]}
+            for f, field in enumerate(FIELDS[1:-1], start=1):
+                asset[field] = None if np.isnan(row[f]) else float(row[f])
+            markets.append(asset)
+            if not np.isnan(row[-1]):
+                prices[symbols[a]] = float(row[-1])
+        snapshot = {'timestamp': timestamp, 'markets': markets}
+        if prices:
+            snapshot['prices'] = prices
+        yield snapshot
+
+_dataset = None
+
+def _init_worker(meta):
+    global _dataset
+    _dataset = dict(meta, data=np.load(meta['path'], mmap_mode='r'))
+
+def _evaluate(params, options):
+    weights = {k: params[k] for k in WEIGHT_PARAMS if k in params}
+    skip_rule = {k: params[k] for k in SKIP_PARAMS if k in params}
+    started = time.perf_counter()
+    report = run_backtest(
+        iter_snapshots(_dataset['data'], _dataset['timestamps'], _dataset['symbols'], _dataset['names']),
+        weights=weights,
+        skip_rule=skip_rule,
+        normalization=params.get('normalization', options.get('normalization', 'none')),
+        **{k: v for k, v in options.items() if k != 'normalization'},
+    )
+    report.pop('equity_curve')
+    report.pop('trade_log')
+    report['elapsed'] = time.perf_counter() - started
+    return {'params': params, **report}
+
+def grid_params(grid):
+    """
+    Every combination of a {name: [values]} grid.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def random_params(space, n, seed=0):
+    """
+    `n` random draws from a {name: [values] or {'low', 'high'}} space.
+    """
+    rng = random.Random(seed)
+    draws = []
+    for _ in range(n):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, dict):
+                params[name] = rng.uniform(values['low'], values['high'])
+                if isinstance(values['low'], int) and isinstance(values['high'], int):
+                    params[name] = round(params[name])
+            else:
+                params[name] = rng.choice(values)
+        draws.append(params)
+    return draws
+
+# Metrics where smaller is better
+LOWER_IS_BETTER = ('max_drawdown',)
+
+def _rank_key(metric):
+    # Best first, and runs without a value for the metric last whichever way it sorts
+    sign = 1 if metric in LOWER_IS_BETTER else -1
+
+    def key(result):
+        value = result.get(metric)
+        return (value is None, sign * value if value is not None else 0.0)
+    return key
+
+def run_sweep(snapshots, param_sets, metric='total_return', workers=None, **options):
+    """
+    Backtest every parameter set in a process pool and return the results ranked by `metric`, best first.
+    The snapshots are packed once into a memory-mapped array that all workers share.
+    options: extra BacktestEngine arguments applied to every run (starting_cash, outcome_horizon, ...).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = SweepDataset.build(snapshots, os.path.join(tmp, 'dataset.npy'))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dataset.meta(),)) as pool:
+            results = list(pool.map(_evaluate, param_sets, itertools.repeat(options), chunksize=max(1, len(param_sets) // (4 * (workers or os.cpu_count() or 1)))))
+    results.sort(key=_rank_key(metric))
+    for rank, result in enumerate(results, start=1):
+        result['rank'] = rank
+    return results
+
+def format_report(results, metric, top=20):
+    lines = [f"{'rank':>4}  {metric:>14}  {'return':>8}  {'drawdown':>8}  {'win rate':>8}  {'trades':>6}  params"]
+    for result in results[:top]:
+        win_rate = f"{result['win_rate']:.2f}" if result['win_rate'] is not None else '-'
+        value = f"{result[metric]:.4f}" if result.get(metric) is not None else '-'
+        lines.append(
+            f"{result['rank']:>4}  {value:>14}  {result['total_return']:>8.2%}  "
+            f"{result['max_drawdown']:>8.2%}  {win_rate:>8}  {result['trades']:>6}  {json.dumps(result['params'])}"
+        )
+    return '\n'.join(lines)
+
+def save_report(results, directory=SWEEP_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"sweep_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+if __name__ == "__main__":
+    config = load_config()
+    options = config.get('sweep') or {}
+    parser = argparse.ArgumentParser(description='Parallel parameter sweep over recorded market snapshots.')
+    parser.add_argument('path', nargs='?', default=(config.get('backtest') or {}).get('snapshot_dir', 'logs/snapshots'))
+    parser.add_argument('--random', type=int, default=0, help='number of random draws instead of the full grid')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=options.get('workers'))
+    parser.add_argument('--metric', default=options.get('metric', 'total_return'))
+    parser.add_argument('--horizon', type=int, default=options.get('outcome_horizon', 1))
+    args = parser.parse_args()
+    space = options.get('grid') or {k: [v] for k, v in (config.get('scoring') or {}).get('weights', {}).items()}
+    param_sets = random_params(space, args.random, args.seed) if args.random else grid_params(space)
+    started = time.perf_counter()
+    results = run_sweep(load_snapshots(args.path), param_sets, metric=args.metric, workers=args.workers, outcome_horizon=args.horizon)
+    print(format_report(results, args.metric))
+    print(f"{len(results)} runs in {time.perf_counter() - started:.1f}s; full report: {save_report(results)}")
@@ -1,33 +1,233 @@
-import os
+import asyncio
+import itertools
 import json
-from datetime import datetime
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from settings import load_config
 
 TRADE_COUNT_DIR = 'logs'
 
-def _trade_count_path():
-    date_str = datetime.utcnow().strftime('%Y%m%d')
-    return os.path.join(TRADE_COUNT_DIR, f'trade_counts_{date_str}.json')
+def _date_str(dt=None):
+    return (dt or datetime.utcnow()).strftime('%Y%m%d')
+
+def _log_path(date_str, directory=TRADE_COUNT_DIR):
+    return os.path.join(directory, f'trade_counts_{date_str}.log')
+
+def _legacy_path(date_str, directory=TRADE_COUNT_DIR):
+    return os.path.join(directory, f'trade_counts_{date_str}.json')
+
+def _read_log(path, repair=False):
+    events = []
+    if not os.path.exists(path):
+        return events
+    with open(path, 'rb+' if repair else 'rb') as f:
+        data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if repair and complete < len(data):
+            # Drop a torn final line from a crash mid-append so new records start on a fresh line
+            f.truncate(complete)
+    for line in data[:complete].splitlines():
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue
+    return events
+
+class TradeLimiter:
+    """
+    In-memory daily and rolling-window trade limits with atomic check-and-reserve.
+
+    reserve() checks every limit and holds a slot in one step, so concurrent trades cannot
+    both pass the same check; commit() turns the reservation into a counted trade and
+    release() gives the slot back. Counted trades and resets are appended to
+    logs/trade_counts_YYYYMMDD.log by a write-behind buffer (flush() / run_flusher()),
+    and replayed from that log on startup.
+
+    rolling_limits: list of {'window_seconds', 'overall', 'per_asset'} dicts (either limit optional).
+    """
+    def __init__(self, per_asset_daily, overall_daily, rolling_limits=None, directory=TRADE_COUNT_DIR, fsync=False):
+        self.per_asset_daily = per_asset_daily
+        self.overall_daily = overall_daily
+        self.rolling_limits = list(rolling_limits or [])
+        self.directory = directory
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._reservations = {}  # reservation id -> asset
+        self._pending = []  # log lines not yet written
+        self._max_window = max((r['window_seconds'] for r in self.rolling_limits), default=0)
+        self._recent = None  # deque of (epoch seconds, asset) within the longest rolling window
+        self._load(_date_str())
+
+    def _load(self, date_str):
+        self.date_str = date_str
+        self.overall = 0
+        self.assets = {}
+        events = _read_log(_log_path(date_str, self.directory), repair=True)
+        legacy = _legacy_path(date_str, self.directory)
+        if not events and os.path.exists(legacy):
+            with open(legacy, 'r') as f:
+                snapshot = json.load(f)
+            events = [{'op': 'snapshot', 'overall': snapshot['overall'], 'assets': snapshot['assets']}]
+            self._pending.append(events[0])
+        for event in events:
+            self._apply(event)
+        # Rolling windows can reach back across midnight
+        self._recent = deque()
+        if self._max_window:
+            yesterday = _date_str(datetime.strptime(date_str, '%Y%m%d') - timedelta(days=1))
+            cutoff = time.time() - self._max_window
+            earlier = [e for e in _read_log(_log_path(yesterday, self.directory)) if e.get('op') == 'trade']
+            for event in earlier + [e for e in events if e.get('op') == 'trade']:
+                if event['ts'] >= cutoff:
+                    self._recent.append((event['ts'], event['asset']))
+
+    def _apply(self, event):
+        op = event.get('op')
+        if op == 'trade':
+            self.overall += 1
+            self.assets[event['asset']] = self.assets.get(event['asset'], 0) + 1
+        elif op == 'reset':
+            self.overall = 0
+            self.assets = {}
+        elif op == 'snapshot':
+            self.overall = event['overall']
+            self.assets = dict(event['assets'])
+
+    def _roll_day(self):
+        today = _date_str()
+        if today != self.date_str:
+            self._flush_locked()
+            self._load(today)
+
+    def _trim_recent(self, now):
+        while self._recent and self._recent[0][0] < now - self._max_window:
+            self._recent.popleft()
+
+    def _limit_reason(self, asset, now):
+        held = list(self._reservations.values())
+        if self.overall + len(held) >= self.overall_daily:
+            return f"Overall daily trade limit ({self.overall_daily}) reached"
+        if self.assets.get(asset, 0) + held.count(asset) >= self.per_asset_daily:
+            return f"Per-asset daily trade limit ({self.per_asset_daily}) reached for {asset}"
+        for rule in self.rolling_limits:
+            cutoff = now - rule['window_seconds']
+            window = [a for ts, a in self._recent if ts >= cutoff] + held
+            if rule.get('overall') is not None and len(window) >= rule['overall']:
+                return f"Rolling limit of {rule['overall']} trades per {rule['window_seconds']}s reached"
+            if rule.get('per_asset') is not None and window.count(asset) >= rule['per_asset']:
+                return f"Rolling limit of {rule['per_asset']} {asset} trades per {rule['window_seconds']}s reached"
+        return None
+
+    def reserve(self, asset):
+        """
+        Atomically check all limits for one more `asset` trade and hold a slot for it.
+        Returns (reservation_id, None) on success, or (None, reason) when a limit is reached.
+        """
+        with self._lock:
+            self._roll_day()
+            now = time.time()
+            self._trim_recent(now)
+            reason = self._limit_reason(asset, now)
+            if reason:
+                return None, reason
+            reservation = next(self._ids)
+            self._reservations[reservation] = asset
+            return reservation, None
+
+    def commit(self, reservation):
+        with self._lock:
+            asset = self._reservations.pop(reservation)
+            self._record(asset)
+
+    def release(self, reservation):
+        with self._lock:
+            self._reservations.pop(reservation, None)
+
+    def _record(self, asset):
+        self._roll_day()
+        event = {'op': 'trade', 'ts': time.time(), 'asset': asset}
+        self._apply(event)
+        if self._max_window:
+            self._recent.append((event['ts'], asset))
+        self._pending.append(event)
+
+    def increment(self, asset):
+        with self._lock:
+            self._record(asset)
+
+    def counts(self):
+        with self._lock:
+            self._roll_day()
+            return {"overall": self.overall, "assets": dict(self.assets)}
+
+    def reset(self):
+        with self._lock:
+            self._roll_day()
+            event = {'op': 'reset', 'ts': time.time()}
+            self._apply(event)
+            self._pending.append(event)
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        data = ''.join(json.dumps(e) + '\n' for e in self._pending)
+        with open(_log_path(self.date_str, self.directory), 'a') as f:
+            f.write(data)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    async def run_flusher(self, interval=1.0):
+        """
+        Background task that writes buffered events every `interval` seconds.
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                self.flush()
+        finally:
+            self.flush()
+
+def build_trade_limiter(config, directory=TRADE_COUNT_DIR):
+    limits = config.get('trade_limits') or {}
+    return TradeLimiter(
+        per_asset_daily=limits.get('per_asset_daily', 2),
+        overall_daily=limits.get('overall_daily', 5),
+        rolling_limits=limits.get('rolling'),
+        directory=directory,
+        fsync=limits.get('fsync', False),
+    )
+
+# Shared limiter, replayed from today's count log on first use
+_trade_limiter = None
 
-def _load_counts():
-    path = _trade_count_path()
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
-    return {"overall": 0, "assets": {}}
+def get_trade_limiter():
+    global _trade_limiter
+    if _trade_limiter is None:
+        _trade_limiter = build_trade_limiter(load_config())
+    return _trade_limiter
 
-def _save_counts(counts):
-    path = _trade_count_path()
-    with open(path, 'w') as f:
-        json.dump(counts, f)
+def __getattr__(name):
+    if name == 'trade_limiter':
+        return get_trade_limiter()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def increment_trade(asset):
-    counts = _load_counts()
-    counts["overall"] += 1
-    counts["assets"][asset] = counts["assets"].get(asset, 0) + 1
-    _save_counts(counts)
+    get_trade_limiter().increment(asset)
 
 def get_trade_counts():
-    return _load_counts()
+    return get_trade_limiter().counts()
 
 def reset_trade_counts():
-    _save_counts({"overall": 0, "assets": {}}) 
\ No newline at end of file
+    get_trade_limiter().reset()
@@ -1,54 +1,81 @@
-import yaml
 import asyncio
-from recall_sandbox_client import RecallSandboxClient
+import time
+from recall_sandbox_client import get_recall_client
+from portfolio_service import get_portfolio_service
+from metrics import metrics
 
-with open('config.yaml') as f:
-    config = yaml.safe_load(f)
+DEFAULT_TRADE_TIMEOUT = 30.0
 
-recall_client = RecallSandboxClient({
-    'recall_api_url': config.get('recall_api_url', 'https://api.sandbox.competitions.recall.network/api'),
-    'recall_api_key': config['api_keys']['recall']
-})
+async def _do_trade(symbol, decision, amount, slippage_tolerance, counter_asset, client, portfolio):
+    symbol_address = await portfolio.address(symbol)
+    counter_address = await portfolio.address(counter_asset)
+    if symbol_address is None or counter_address is None:
+        print(f"[WARN] Symbol {symbol} or counter asset {counter_asset} not found in Recall portfolio. Skipping trade.")
+        return None
+    from_token, to_token = (counter_address, symbol_address) if decision == 'Buy' else (symbol_address, counter_address)
+    reason = f"Automated {decision.lower()} by Easel-and-Ether agent."
+    # Use default chain params (can be extended)
+    from_chain = to_chain = 'ethereum'
+    from_specific_chain = to_specific_chain = 'mainnet'
+    result = await client.execute_trade(
+        from_token=from_token,
+        to_token=to_token,
+        amount=amount,
+        reason=reason,
+        slippage_tolerance=slippage_tolerance,
+        from_chain=from_chain,
+        from_specific_chain=from_specific_chain,
+        to_chain=to_chain,
+        to_specific_chain=to_specific_chain
+    )
+    # Balances changed: the next portfolio read must refetch
+    portfolio.invalidate()
+    print(f"Trade executed: {result}")
+    return result
 
-# Global cache for symbol-to-address mapping
-_symbol_to_address = None
-
-async def _get_symbol_to_address():
-    global _symbol_to_address
-    if _symbol_to_address is None:
-        portfolio = await recall_client.get_portfolio()
-        # Build mapping: symbol (upper) -> address
-        _symbol_to_address = {t['symbol'].upper(): t['token'] for t in portfolio.get('tokens', [])}
-    return _symbol_to_address
-
-def execute_trade(symbol, decision, amount=1, slippage_tolerance=0.5, counter_asset='ETH'):
+async def execute_trade(symbol, decision, amount=1, slippage_tolerance=0.5, counter_asset='ETH', timeout=DEFAULT_TRADE_TIMEOUT, client=None, portfolio=None):
     """
     Execute a trade (buy/sell) for the given asset using Recall's trade execution API.
+    `client` and `portfolio` default to the shared recall_client and portfolio_service.
+    Returns a dict with symbol, action, amount, status ('executed', 'skipped', 'failed' or 'timeout'),
+    the raw Recall `result`, an `error` message and the `elapsed` seconds.
+    """
+    started = time.monotonic()
+    outcome = {'symbol': symbol, 'action': decision, 'amount': amount, 'status': 'executed', 'result': None, 'error': None}
+    try:
+        result = await asyncio.wait_for(_do_trade(
+            symbol, decision, amount, slippage_tolerance, counter_asset,
+            client or get_recall_client(), portfolio or get_portfolio_service(),
+        ), timeout)
+        outcome['result'] = result
+        if result is None:
+            outcome['status'] = 'skipped'
+    except asyncio.TimeoutError:
+        print(f"[WARN] Trade {decision} {amount} {symbol} timed out after {timeout}s.")
+        outcome['status'] = 'timeout'
+        outcome['error'] = f"timed out after {timeout}s"
+    except Exception as e:
+        print(f"[WARN] Trade {decision} {amount} {symbol} failed: {e}")
+        outcome['status'] = 'failed'
+        outcome['error'] = str(e)
+    outcome['elapsed'] = time.monotonic() - started
+    metrics.inc('trades_total', status=outcome['status'])
+    metrics.observe('trade_execution', outcome['elapsed'], status=outcome['status'])
+    return outcome
+
+async def execute_trades(orders, timeout=DEFAULT_TRADE_TIMEOUT, concurrency=None):
     """
-    async def _do_trade():
-        symbol_map = await _get_symbol_to_address()
-        symbol_u = symbol.upper()
-        counter_u = counter_asset.upper()
-        if symbol_u not in symbol_map or counter_u not in symbol_map:
-            print(f"[WARN] Symbol {symbol} or counter asset {counter_asset} not found in Recall portfolio. Skipping trade.")
-            return None
-        from_token, to_token = (symbol_map[counter_u], symbol_map[symbol_u]) if decision == 'Buy' else (symbol_map[symbol_u], symbol_map[counter_u])
-        reason = f"Automated {decision.lower()} by Easel-and-Ether agent."
-        # Use default chain params (can be extended)
-        from_chain = to_chain = 'ethereum'
-        from_specific_chain = to_specific_chain = 'mainnet'
-        result = await recall_client.execute_trade(
-            from_token=from_token,
-            to_token=to_token,
-            amount=amount,
-            reason=reason,
-            slippage_tolerance=slippage_tolerance,
-            from_chain=from_chain,
-            from_specific_chain=from_specific_chain,
-            to_chain=to_chain,
-            to_specific_chain=to_specific_chain
-        )
-        print(f"Trade executed: {result}")
-        return result
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(_do_trade()) 
\ No newline at end of file
+    Submit several trades concurrently, each with its own timeout.
+    orders: iterable of dicts with symbol, action and optional amount, slippage_tolerance, counter_asset.
+    Returns the execute_trade results in the same order as `orders`.
+    """
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def _run(order):
+        kwargs = {k: order[k] for k in ('amount', 'slippage_tolerance', 'counter_asset') if k in order}
+        if semaphore is None:
+            return await execute_trade(order['symbol'], order['action'], timeout=timeout, **kwargs)
+        async with semaphore:
+            return await execute_trade(order['symbol'], order['action'], timeout=timeout, **kwargs)
+
+    return await asyncio.gather(*(_run(o) for o in orders))
@@ -1,26 +1,7 @@
-import os
-import json
-from statistics import mean, stdev
-from datetime import datetime
+from indicators import get_indicators
+from price_history import get_history
 
-HISTORY_DIR = 'logs/history'
-HISTORY_LENGTH = 10  # Number of points to keep per asset
-os.makedirs(HISTORY_DIR, exist_ok=True)
-
-def _history_path(symbol):
-    return os.path.join(HISTORY_DIR, f"{symbol}_history.json")
-
-def _load_history(symbol):
-    path = _history_path(symbol)
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            return json.load(f)
-    return []
-
-def _save_history(symbol, history):
-    path = _history_path(symbol)
-    with open(path, 'w') as f:
-        json.dump(history, f)
+HISTORY_LENGTH = 10  # Number of recent points shown in chart snapshots
 
 def describe_market_painterly(data):
     """
@@ -31,44 +12,14 @@ def describe_market_painterly(data):
     price = data.get('price', 0.0)
     volume = data.get('volume', 0.0)
     on_chain = data.get('on_chain', {})
-    now = datetime.utcnow().isoformat() + 'Z'
-
-    # Load and update history
-    history = _load_history(symbol)
-    history.append({'timestamp': now, 'price': price, 'volume': volume})
-    if len(history) > HISTORY_LENGTH:
-        history = history[-HISTORY_LENGTH:]
-    _save_history(symbol, history)
-
-    # Compute trends
-    prices = [h['price'] for h in history if h['price'] is not None]
-    volumes = [h['volume'] for h in history if h['volume'] is not None]
-    price_trend = 'unknown'
-    volume_trend = 'unknown'
-    volatility = 0.0
 
-    if len(prices) >= 2:
-        delta = prices[-1] - prices[0]
-        pct = (delta / prices[0]) if prices[0] else 0
-        if abs(pct) < 0.01:
-            price_trend = 'flat'
-        elif pct > 0.01:
-            price_trend = 'rising'
-        elif pct < -0.01:
-            price_trend = 'falling'
-        if len(prices) > 2:
-            volatility = stdev(prices)
-            if volatility > 0.03 * mean(prices):
-                price_trend = 'volatile'
-    if len(volumes) >= 2:
-        delta_v = volumes[-1] - volumes[0]
-        pct_v = (delta_v / volumes[0]) if volumes[0] else 0
-        if abs(pct_v) < 0.05:
-            volume_trend = 'steady'
-        elif pct_v > 0.05:
-            volume_trend = 'surging'
-        elif pct_v < -0.05:
-            volume_trend = 'dropping'
+    # Append to the shared ring buffer and advance this symbol's streaming indicators
+    history = get_history(symbol)
+    indicators = get_indicators(symbol, history)
+    history.append(price, volume)
+    indicators.update(price, volume)
+    price_trend = indicators.price_trend()
+    volume_trend = indicators.volume_trend()
 
     # Metaphor templates
     metaphors = {